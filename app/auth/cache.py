@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.auth.config import PRINCIPAL_CACHE_MAX_SIZE, PRINCIPAL_CACHE_TTL
+
+
+class PrincipalCache:
+    """
+    Time-to-live cache of the roles of authenticated users, keyed by username.
+
+    Roles are cached as scope bitmasks (see app.auth.scopes). validate_token only needs a
+    user's roles, caching them spares a session and a query on
+    every protected request. An entry never outlives the token it was loaded for, and the
+    user services invalidate entries as soon as a user's username or roles change or the
+    user is deleted. The cache is local to the process: other processes see such changes
+    once their own entries expire.
+
+    Attributes:
+        ttl: The maximum number of seconds an entry is kept.
+        max_size: The maximum number of entries, the oldest are evicted first.
+    """
+
+    def __init__(
+        self, ttl: float = PRINCIPAL_CACHE_TTL, max_size: int = PRINCIPAL_CACHE_MAX_SIZE
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, username: str) -> int | None:
+        """
+        Look up the roles of a user.
+
+        Args:
+            username: The username of the user.
+        Returns:
+            The roles bitmask of the user, or None if it is not cached or has expired.
+        """
+        with self.lock:
+            entry = self.entries.get(username)
+            if entry is None:
+                return None
+            roles, expires_at = entry
+            if expires_at <= time.time():
+                del self.entries[username]
+                return None
+            return roles
+
+    def put(self, username: str, roles: int, token_expires_at: float | None) -> None:
+        """
+        Cache the roles of a user.
+
+        Args:
+            username: The username of the user.
+            roles: The roles bitmask of the user.
+            token_expires_at: The expiry timestamp of the token the roles were loaded for.
+        """
+        if self.ttl <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self.lock:
+            self.entries.pop(username, None)
+            self.entries[username] = (roles, expires_at)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, *usernames: str) -> None:
+        """
+        Remove the cached roles of users.
+
+        Args:
+            usernames: The usernames of the users.
+        """
+        with self.lock:
+            for username in usernames:
+                self.entries.pop(username, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+principal_cache = PrincipalCache()
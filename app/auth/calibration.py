@@ -0,0 +1,76 @@
+import time
+
+from passlib.hash import bcrypt
+
+from app.auth.config import (
+    PASSWORD_HASH_MAX_ROUNDS,
+    PASSWORD_HASH_MIN_ROUNDS,
+    PASSWORD_HASH_ROUNDS,
+    PASSWORD_HASH_TARGET_MS,
+)
+
+BENCHMARK_PASSWORD = "correct horse battery staple"
+
+
+def measure_verify_time(rounds: int, samples: int = 1) -> float:
+    """
+    Measure how long verifying a password takes with a given bcrypt cost.
+
+    Args:
+        rounds: The bcrypt cost, the number of rounds being 2 to its power.
+        samples: The number of verifications to average.
+    Returns:
+        The average verification time, in milliseconds.
+    """
+    hashed_password = bcrypt.using(rounds=rounds).hash(BENCHMARK_PASSWORD)
+    start = time.perf_counter()
+    for _ in range(samples):
+        bcrypt.verify(BENCHMARK_PASSWORD, hashed_password)
+    return (time.perf_counter() - start) / samples * 1000
+
+
+def calibrate_rounds(
+    target_ms: float = PASSWORD_HASH_TARGET_MS,
+    min_rounds: int = PASSWORD_HASH_MIN_ROUNDS,
+    max_rounds: int = PASSWORD_HASH_MAX_ROUNDS,
+) -> int:
+    """
+    Pick the highest bcrypt cost whose verification time fits a latency budget on this host.
+
+    Each extra round doubles the verification time, so the time is measured at the lowest
+    cost only and extrapolated from there.
+    Args:
+        target_ms: The latency budget of a verification, in milliseconds.
+        min_rounds: The lowest acceptable cost, used even when it exceeds the budget.
+        max_rounds: The highest cost to consider.
+    Returns:
+        The bcrypt cost.
+    """
+    elapsed = measure_verify_time(min_rounds, samples=2)
+    rounds = min_rounds
+    while rounds < max_rounds and elapsed * 2 <= target_ms:
+        elapsed *= 2
+        rounds += 1
+    return rounds
+
+
+def get_password_hash_rounds() -> int:
+    """
+    Get the bcrypt cost to hash passwords with: PASSWORD_HASH_ROUNDS if set, otherwise the
+    calibrated cost.
+    """
+    if PASSWORD_HASH_ROUNDS is not None:
+        return PASSWORD_HASH_ROUNDS
+    return calibrate_rounds()
+
+
+if __name__ == "__main__":
+    # Report the verification latency at each cost, to balance throughput and security
+    calibrated_rounds = calibrate_rounds()
+    print(
+        f"target: {PASSWORD_HASH_TARGET_MS:.0f} ms, calibrated cost: {calibrated_rounds}"
+    )
+    print("cost  verify (ms)  verifies/s/core")
+    for rounds in range(PASSWORD_HASH_MIN_ROUNDS, PASSWORD_HASH_MAX_ROUNDS + 1):
+        elapsed = measure_verify_time(rounds, samples=3 if rounds < 13 else 1)
+        print(f"{rounds:>4}  {elapsed:>11.1f}  {1000 / elapsed:>15.1f}")
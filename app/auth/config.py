@@ -1,3 +1,5 @@
+import os
+
 OAUTH_SCOPES = {
     "user.create": "The ability to create a new user.",
     "user:own": "Read only access to the current user's information.",
@@ -12,3 +14,35 @@ OAUTH_SCOPES = {
     "websockets": "Access to the websocket.",
     "admin": "Full access to all information.",
 }
+
+# Roles of authenticated users cached by validate_token (see app.auth.cache).
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 30))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", 10000))
+
+# "strict" checks the roles of the user in the database (through the cache above) on every
+# request, "stateless" trusts the roles embedded in tokens while their roles version is
+# current (see app.auth.versions).
+AUTH_MODE = os.getenv("AUTH_MODE", "strict")
+ROLES_VERSIONS_REFRESH_INTERVAL = float(
+    os.getenv("ROLES_VERSIONS_REFRESH_INTERVAL", 30)
+)
+
+# Threads hashing and verifying passwords (see app.auth.pool). bcrypt is CPU-bound, leave
+# cores to the event loop and the QR code render pool.
+PASSWORD_HASHING_WORKERS = int(
+    os.getenv("PASSWORD_HASHING_WORKERS", max((os.cpu_count() or 1) // 2, 1))
+)
+PASSWORD_HASHING_QUEUE_SIZE = int(os.getenv("PASSWORD_HASHING_QUEUE_SIZE", 16))
+
+# bcrypt cost of password hashes (see app.auth.calibration). Unless PASSWORD_HASH_ROUNDS is
+# set, the highest cost whose verification fits PASSWORD_HASH_TARGET_MS is picked at
+# startup. It is never below PASSWORD_HASH_MIN_ROUNDS, passlib's default of 12, nor above
+# PASSWORD_HASH_MAX_ROUNDS. Stored hashes up to PASSWORD_HASH_MAX_ROUNDS are kept as is.
+PASSWORD_HASH_ROUNDS = (
+    int(os.environ["PASSWORD_HASH_ROUNDS"])
+    if "PASSWORD_HASH_ROUNDS" in os.environ
+    else None
+)
+PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", 250))
+PASSWORD_HASH_MIN_ROUNDS = int(os.getenv("PASSWORD_HASH_MIN_ROUNDS", 12))
+PASSWORD_HASH_MAX_ROUNDS = int(os.getenv("PASSWORD_HASH_MAX_ROUNDS", 16))
@@ -7,8 +7,16 @@ from jose import JWTError, jwt
 from pydantic import ValidationError
 
 from app.dependencies import get_user_by_username
-from app.auth.config import OAUTH_SCOPES
+from app.auth.cache import principal_cache
+from app.auth.config import AUTH_MODE, OAUTH_SCOPES
 from app.auth.models import TokenData
+from app.auth.scopes import (
+    ADMIN_SCOPE_BIT,
+    get_roles_mask,
+    get_scopes_mask,
+    get_unknown_scopes,
+)
+from app.auth.versions import roles_versions
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
@@ -51,28 +59,45 @@ async def validate_token(
         username = payload.get("sub")
         if username is None:
             raise credentials_exception
+        token_expires_at = payload.get("exp")
+        token_roles = payload.get("roles")
+        token_user_id = payload.get("uid")
+        token_roles_version = payload.get("ver")
         token_scopes = payload.get("scopes", [])
         token_data = TokenData(scopes=token_scopes, username=username)
     except (JWTError, ValidationError):
         raise credentials_exception
 
-    try:
-        assert token_data.username is not None
+    assert token_data.username is not None
+    # No role can grant a scope missing from the registry
+    if get_unknown_scopes(token_data.scopes):
+        raise permissions_exception
+    if (
+        AUTH_MODE == "stateless"
+        and token_roles is not None
+        and token_user_id is not None
+        and token_roles_version is not None
+        and roles_versions.get(token_data.username)
+        == (token_user_id, token_roles_version)
+    ):
+        # The roles embedded in the token are current, no need to look the user up
+        user_mask = get_roles_mask(token_roles)
+    else:
+        user_mask = principal_cache.get(token_data.username)
+    if user_mask is None:
         user = await get_user_by_username(token_data.username)
-        user_scopes: list[str] = user.roles.split(" ")
-        # Allow admin users to act as if they have any scope
-        if "admin" in user_scopes:
-            return token_data
-        # Iterating through token scopes against scopes defined in user instance.
-        for scope in token_data.scopes:
-            if scope not in user_scopes:
-                print(f"scope {scope} not in {user_scopes}")
-                raise permissions_exception
-    except HTTPException as e:
-        raise e
-
-    # Iterating through dependent's scopes against scopes defined in token.
-    for scope in security_scopes.scopes:
-        if scope not in token_data.scopes:
-            raise permissions_exception
+        user_mask = get_roles_mask(user.roles)
+        principal_cache.put(token_data.username, user_mask, token_expires_at)
+    # Allow admin users to act as if they have any scope
+    if user_mask & ADMIN_SCOPE_BIT:
+        return token_data
+    # Token scopes must be granted by the user's roles
+    token_mask = get_scopes_mask(tuple(token_data.scopes))
+    if token_mask & ~user_mask:
+        raise permissions_exception
+    # Dependent's scopes must be present in the token
+    if get_unknown_scopes(security_scopes.scopes):
+        raise permissions_exception
+    if get_scopes_mask(tuple(security_scopes.scopes)) & ~token_mask:
+        raise permissions_exception
     return token_data
@@ -17,3 +17,9 @@ username_already_exists = HTTPException(
     detail="Username already exists",
     headers={"WWW-Authenticate": "Bearer"},
 )
+
+password_hashing_busy = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many password checks in progress, try again later",
+    headers={"Retry-After": "1"},
+)
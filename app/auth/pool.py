@@ -0,0 +1,81 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from app.auth.config import PASSWORD_HASHING_QUEUE_SIZE, PASSWORD_HASHING_WORKERS
+from app.auth.exceptions import password_hashing_busy
+
+T = TypeVar("T")
+
+
+class PasswordHashingPool:
+    """
+    Bounded pool of threads hashing and verifying passwords.
+
+    bcrypt takes hundreds of milliseconds per call by design, and releases the GIL while
+    doing so: running it in a few dedicated threads keeps the event loop serving other
+    requests during a login storm. At most queue_size calls can be pending at once,
+    further calls are rejected straight away instead of queueing for seconds.
+
+    Attributes:
+        workers: The number of hashing threads.
+        queue_size: The maximum number of pending calls, including running ones.
+        pending: The current number of pending calls.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASHING_WORKERS,
+        queue_size: int = PASSWORD_HASHING_QUEUE_SIZE,
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.pending = 0
+        self.executor: ThreadPoolExecutor | None = None
+
+    def start(self) -> None:
+        """
+        Start the hashing threads.
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hashing"
+            )
+
+    async def run(self, function: Callable[..., T], *args) -> T:
+        """
+        Run a hashing function in one of the pool's threads.
+
+        Args:
+            function: The function to run.
+            args: The arguments of the function.
+        Returns:
+            The result of the function.
+        Raises:
+            HTTPException: The queue is full (503).
+        """
+        if self.pending >= self.queue_size:
+            raise password_hashing_busy
+        self.start()
+        assert self.executor is not None
+        loop = asyncio.get_running_loop()
+        future = self.executor.submit(function, *args)
+        self.pending += 1
+        # A call whose caller was cancelled keeps its thread busy until it completes, it
+        # stays pending until then. Done callbacks run in the executor's thread.
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.release))
+        return await asyncio.wrap_future(future)
+
+    def release(self) -> None:
+        self.pending -= 1
+
+    def shutdown(self) -> None:
+        """
+        Stop the hashing threads, cancelling the calls which have not started yet.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+password_hashing_pool = PasswordHashingPool()
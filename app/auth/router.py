@@ -5,7 +5,7 @@ from datetime import timedelta
 from fastapi import Depends, HTTPException, status, APIRouter
 from fastapi.security import OAuth2PasswordRequestForm
 from dotenv import load_dotenv
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.auth.exceptions import username_already_exists
 from app.auth.services import authenticate_user, create_access_token
@@ -25,7 +25,7 @@ async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ):
     try:
-        user = authenticate_user(form_data.username, form_data.password)
+        user = await authenticate_user(form_data.username, form_data.password)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -37,6 +37,7 @@ async def login_for_access_token(
     access_token = create_access_token(
         data={"sub": user.username, "scopes": form_data.scopes},
         expires_delta=access_token_expires,
+        user=user,
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -44,10 +45,10 @@ async def login_for_access_token(
 @router.post("/register", response_model=Token)
 async def register_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     service = UserService(session)
-    if service.get_user_by_attribute(UserAttribute.USERNAME, form_data.username):
+    if await service.get_user_by_attribute(UserAttribute.USERNAME, form_data.username):
         raise username_already_exists
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -0,0 +1,63 @@
+from functools import lru_cache
+from typing import Iterable
+
+from app.auth.config import OAUTH_SCOPES
+
+# Bit position of every scope, in the order of the registry
+SCOPE_BITS: dict[str, int] = {
+    scope: 1 << position for position, scope in enumerate(OAUTH_SCOPES)
+}
+ADMIN_SCOPE_BIT = SCOPE_BITS["admin"]
+
+
+def get_unknown_scopes(scopes: Iterable[str]) -> set[str]:
+    """
+    Get the scopes which are missing from the registry.
+
+    Args:
+        scopes: The scopes to check.
+    Returns:
+        The unknown scopes.
+    """
+    return {scope for scope in scopes if scope not in SCOPE_BITS}
+
+
+@lru_cache(maxsize=1024)
+def get_scopes_mask(scopes: tuple[str, ...]) -> int:
+    """
+    Compile scopes into a bitmask.
+
+    Scopes missing from the registry have no bit, check them with get_unknown_scopes.
+    Args:
+        scopes: The scopes to compile, empty strings and unknown scopes are ignored.
+    Returns:
+        The bitmask of the scopes.
+    """
+    mask = 0
+    for scope in scopes:
+        mask |= SCOPE_BITS.get(scope, 0)
+    return mask
+
+
+def get_roles_mask(roles: str) -> int:
+    """
+    Compile space separated roles, as stored on users, into a bitmask.
+
+    Args:
+        roles: The roles to compile.
+    Returns:
+        The bitmask of the roles.
+    """
+    return get_scopes_mask(tuple(roles.split(" ")))
+
+
+def get_mask_scopes(mask: int) -> list[str]:
+    """
+    Get the scopes of a bitmask.
+
+    Args:
+        mask: The bitmask.
+    Returns:
+        The scopes whose bits are set, in the order of the registry.
+    """
+    return [scope for scope, bit in SCOPE_BITS.items() if mask & bit]
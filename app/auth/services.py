@@ -4,10 +4,13 @@ from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
 from jose import jwt
 from sqlalchemy.exc import NoResultFound
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.auth.config import PASSWORD_HASH_MAX_ROUNDS
 from app.auth.exceptions import incorrect_username_or_password
-from app.database import engine
+from app.auth.pool import password_hashing_pool
+from app.database import async_engine
 from app.users.exceptions import user_not_found
 from app.users.models import User
 
@@ -26,19 +29,76 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
-def authenticate_user(username: str, password: str):
-    try:
-        session: Session = Session(engine)
-        user = session.exec(select(User).where(User.username == username)).one()
-    except NoResultFound:
-        raise user_not_found
-    if not verify_password(password, user.hashed_password):
-        raise incorrect_username_or_password
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def configure_password_hashing(rounds: int) -> None:
+    """
+    Set the bcrypt cost of new password hashes.
+
+    Cheaper hashes are rehashed on the next successful login. Costlier hashes are kept up
+    to PASSWORD_HASH_MAX_ROUNDS, so that they are never downgraded, and so that processes
+    whose calibrations differ do not keep rehashing each other's hashes.
+    Args:
+        rounds: The bcrypt cost.
+    """
+    pwd_context.update(
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=max(rounds, PASSWORD_HASH_MAX_ROUNDS),
+    )
+
+
+async def hash_password(password: str) -> str:
+    """
+    Hash a password in the password hashing pool, without blocking the event loop.
+    """
+    return await password_hashing_pool.run(get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password in the password hashing pool, without blocking the event loop.
+    """
+    return await password_hashing_pool.run(
+        verify_password, plain_password, hashed_password
+    )
+
+
+async def authenticate_user(username: str, password: str):
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        try:
+            user = (
+                await session.exec(select(User).where(User.username == username))
+            ).one()
+        except NoResultFound:
+            raise user_not_found
+        valid, new_hashed_password = await password_hashing_pool.run(
+            verify_and_update_password, password, user.hashed_password
+        )
+        if not valid:
+            raise incorrect_username_or_password
+        if new_hashed_password is not None:
+            # The stored hash was made with another cost, replace it while we know the password
+            user.hashed_password = new_hashed_password
+            session.add(user)
+            await session.commit()
+            await session.refresh(user)
     return user
 
 
-def create_access_token(data: dict, expires_delta: timedelta | None = None):
+def create_access_token(
+    data: dict, expires_delta: timedelta | None = None, user: User | None = None
+):
     to_encode = data.copy()
+    if user is not None:
+        # Lets validate_token authorize stateless tokens without a database lookup
+        to_encode.update(
+            {"roles": user.roles, "uid": str(user.id), "ver": user.roles_version}
+        )
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
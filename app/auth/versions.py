@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import threading
+from uuid import UUID
+
+from sqlmodel import Session, select
+
+from app.auth.config import ROLES_VERSIONS_REFRESH_INTERVAL
+from app.database import engine
+from app.users.models import User
+
+logger = logging.getLogger(__name__)
+
+
+class RolesVersions:
+    """
+    In-memory map of the ID and current roles version of every user, keyed by username.
+
+    Stateless tokens embed the roles, ID and roles version of their user. A token is
+    only trusted without a database lookup while its ID and version match the ones in
+    this map, so bumping a user's version, renaming or deleting the user revokes the
+    roles embedded in every token issued before. Versions start over at 0 for every new
+    user, the ID keeps a token from matching another user who takes the same username.
+    The user services update the map as soon as they commit such changes, and the map is
+    reloaded from the database every ROLES_VERSIONS_REFRESH_INTERVAL seconds to pick up
+    changes made by other processes.
+
+    Attributes:
+        interval: The number of seconds between reloads.
+    """
+
+    def __init__(self, interval: float = ROLES_VERSIONS_REFRESH_INTERVAL):
+        self.interval = interval
+        self.versions: dict[str, tuple[str, int]] = {}
+        self.lock = threading.Lock()
+        self.task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """
+        Load the map and start reloading it periodically.
+        """
+        self.load()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.load)
+            except Exception:
+                logger.exception("Failed to reload the roles versions")
+
+    def load(self) -> None:
+        """
+        Reload the map from the database.
+        """
+        with Session(engine) as session:
+            rows = session.exec(
+                select(User.username, User.id, User.roles_version)
+            ).all()
+        versions = {
+            username: (str(user_id), version) for username, user_id, version in rows
+        }
+        with self.lock:
+            # A reload racing with a local update must not bring back an older version
+            for username, (user_id, version) in self.versions.items():
+                if versions.get(username, (None, 0))[0] == user_id:
+                    versions[username] = (user_id, max(versions[username][1], version))
+            self.versions = versions
+
+    def get(self, username: str) -> tuple[str, int] | None:
+        """
+        Get the ID and current roles version of a user.
+
+        Args:
+            username: The username of the user.
+        Returns:
+            The ID and roles version, or None if the user is unknown.
+        """
+        return self.versions.get(username)
+
+    def set(self, username: str, user_id: UUID, version: int) -> None:
+        with self.lock:
+            self.versions[username] = (str(user_id), version)
+
+    def remove(self, *usernames: str) -> None:
+        with self.lock:
+            for username in usernames:
+                self.versions.pop(username, None)
+
+
+roles_versions = RolesVersions()
@@ -0,0 +1,240 @@
+import argparse
+import asyncio
+import random
+import tempfile
+import threading
+import time
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+from sqlalchemy import event, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlmodel import SQLModel, create_engine, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import (
+    SQLITE_PROFILES,
+    get_database_urls,
+    get_engine_options,
+    set_sqlite_pragmas,
+)
+from app.employees.models import Employee, EmployeeState
+
+# Number of employees, each with a state, in the benchmark databases
+EMPLOYEES = 2000
+# Number of rows of the import that readers run alongside
+IMPORT_ROWS = 50_000
+
+
+def create_engines(path: str, profile: str) -> tuple[Engine, AsyncEngine]:
+    """
+    Create the engines of a new SQLite database, configured with a given profile.
+
+    Every profile gets its own database: the WAL journal mode persists in the file.
+    Args:
+        path: The path of the database file.
+        profile: The SQLite profile.
+    Returns:
+        The synchronous and asynchronous engines.
+    """
+    sync_url, async_url = get_database_urls(f"sqlite:///{path}")
+    engine = create_engine(sync_url, **get_engine_options(sync_url, QueuePool))
+    async_engine = create_async_engine(
+        async_url, **get_engine_options(async_url, AsyncAdaptedQueuePool)
+    )
+    if profile == "performance":
+        event.listen(engine, "connect", set_sqlite_pragmas)
+        event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Employee),
+            [
+                {
+                    "id": uuid4(),
+                    "internal_id": f"E{i}",
+                    "email": f"e{i}@example.com",
+                    "code_to_print": f"C{i}",
+                    "surname": "Surname",
+                    "firstname": "Firstname",
+                }
+                for i in range(EMPLOYEES)
+            ],
+        )
+        connection.execute(
+            insert(EmployeeState),
+            [
+                {
+                    "id": uuid4(),
+                    "internal_id": f"E{i}",
+                    "code_to_print": f"C{i}",
+                    "email_code_validated": False,
+                    "email_code_sent": False,
+                }
+                for i in range(EMPLOYEES)
+            ],
+        )
+    return engine, async_engine
+
+
+def get_percentile(latencies: list[float], percentile: float) -> float:
+    """
+    Get a percentile of latencies, in milliseconds.
+    """
+    latencies = sorted(latencies)
+    return latencies[min(int(len(latencies) * percentile), len(latencies) - 1)] * 1000
+
+
+async def write_state(async_engine: AsyncEngine) -> None:
+    async with AsyncSession(async_engine) as session:
+        await session.exec(
+            update(EmployeeState)  # type: ignore
+            .where(EmployeeState.internal_id == f"E{random.randrange(EMPLOYEES)}")
+            .values(email_code_sent=random.random() < 0.5)
+        )
+        await session.commit()
+
+
+async def read_employee(async_engine: AsyncEngine) -> None:
+    async with AsyncSession(async_engine) as session:
+        statement = select(Employee).where(
+            Employee.internal_id == f"E{random.randrange(EMPLOYEES)}"
+        )
+        (await session.exec(statement)).one()
+
+
+async def run_until(
+    deadline: float,
+    operation: Callable[[AsyncEngine], Awaitable[None]],
+    async_engine: AsyncEngine,
+    latencies: list[float],
+    errors: list[int],
+) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            await operation(async_engine)
+        except Exception:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def benchmark_load(
+    async_engine: AsyncEngine, writers: int, readers: int, duration: float
+) -> None:
+    """
+    Run concurrent writers, updating employee states, and readers, looking employees up.
+
+    Args:
+        async_engine: The engine of the database.
+        writers: The number of writers.
+        readers: The number of readers.
+        duration: The duration of the run, in seconds.
+    """
+    results: dict[str, tuple[list[float], list[int]]] = {
+        "write": ([], []),
+        "read": ([], []),
+    }
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(
+        *(
+            run_until(deadline, write_state, async_engine, *results["write"])
+            for _ in range(writers)
+        ),
+        *(
+            run_until(deadline, read_employee, async_engine, *results["read"])
+            for _ in range(readers)
+        ),
+    )
+    for kind, (latencies, errors) in results.items():
+        if latencies:
+            print(
+                f"  {kind}s: {len(latencies) / duration:.0f}/s,"
+                f" p50 {get_percentile(latencies, 0.5):.1f} ms,"
+                f" p99 {get_percentile(latencies, 0.99):.1f} ms, {len(errors)} errors"
+            )
+        else:
+            print(f"  {kind}s: none completed, {len(errors)} errors")
+
+
+def import_employees(engine: Engine, elapsed: list[float]) -> None:
+    # One transaction, as a CSV upload
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Employee),
+            [
+                {
+                    "id": uuid4(),
+                    "internal_id": f"I{i}",
+                    "email": f"i{i}@example.com",
+                    "code_to_print": f"K{i}",
+                    "surname": "Surname",
+                    "firstname": "Firstname",
+                }
+                for i in range(IMPORT_ROWS)
+            ],
+        )
+    elapsed.append(time.perf_counter() - start)
+
+
+async def benchmark_import(engine: Engine, async_engine: AsyncEngine) -> None:
+    """
+    Run 4 readers while employees are imported in a single transaction.
+
+    Args:
+        engine: The synchronous engine of the database, used by the import.
+        async_engine: The asynchronous engine of the database, used by the readers.
+    """
+    elapsed: list[float] = []
+    latencies: list[float] = []
+    errors: list[int] = []
+    thread = threading.Thread(target=import_employees, args=(engine, elapsed))
+    thread.start()
+
+    async def reader() -> None:
+        while thread.is_alive():
+            start = time.perf_counter()
+            try:
+                await read_employee(async_engine)
+            except Exception:
+                errors.append(1)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(reader() for _ in range(4)))
+    thread.join()
+    print(
+        f"  {IMPORT_ROWS} rows imported in {elapsed[0]:.1f} s, {len(latencies)} reads,"
+        f" p99 {get_percentile(latencies, 0.99):.0f} ms,"
+        f" max {get_percentile(latencies, 1):.0f} ms, {len(errors)} errors"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the SQLite profiles on temporary databases."
+    )
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in SQLITE_PROFILES:
+            print(f"{profile}:")
+            engine, async_engine = create_engines(f"{directory}/{profile}.db", profile)
+            try:
+                await benchmark_load(
+                    async_engine, args.writers, args.readers, args.duration
+                )
+                await benchmark_import(engine, async_engine)
+            finally:
+                await async_engine.dispose()
+                engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+import time
+
+from sqlmodel import SQLModel, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import ROW_COUNT_CACHE_TTL
+
+
+class RowCountCache:
+    """
+    Time-to-live cache of the number of rows of tables, for the totals of list endpoints.
+
+    Counting rows scans the whole table, so paging through a large table while counting
+    on every page costs a scan per page. Counts are cached for ttl seconds instead, and
+    the services invalidate the count of a table whenever they insert or delete rows of
+    it. The cache is local to the process: changes made by other processes show up once
+    the count expires. Only used from the event loop, so it needs no lock.
+
+    Attributes:
+        ttl: The maximum number of seconds a count is kept.
+    """
+
+    def __init__(self, ttl: float = ROW_COUNT_CACHE_TTL):
+        self.ttl = ttl
+        self.entries: dict[str, tuple[int, float]] = {}
+        # Bumped by invalidate, so that a count started before is not cached after
+        self.versions: dict[str, int] = {}
+
+    async def get(self, session: AsyncSession, model: type[SQLModel]) -> int:
+        """
+        Get the number of rows of a table, counting them if the count is not cached.
+
+        Args:
+            session: The session rows are counted with.
+            model: The model of the table.
+        Returns:
+            The number of rows.
+        """
+        table = str(model.__tablename__)
+        entry = self.entries.get(table)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        version = self.versions.get(table, 0)
+        count = (await session.exec(select(func.count()).select_from(model))).one()
+        if self.ttl > 0 and self.versions.get(table, 0) == version:
+            self.entries[table] = (count, time.monotonic() + self.ttl)
+        return count
+
+    def invalidate(self, *models: type[SQLModel]) -> None:
+        """
+        Remove the cached counts of tables.
+
+        Args:
+            models: The models of the tables.
+        """
+        for model in models:
+            table = str(model.__tablename__)
+            self.entries.pop(table, None)
+            self.versions[table] = self.versions.get(table, 0) + 1
+
+
+row_counts = RowCountCache()
@@ -1,16 +1,202 @@
-from sqlmodel import Session, SQLModel, create_engine
+import asyncio
+from contextlib import AbstractAsyncContextManager, nullcontext
 
-sqlite_file_name = "database.db"
-sqlite_url = f"sqlite:///{sqlite_file_name}"
+from sqlalchemy import Table, event, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, echo=True, connect_args=connect_args)
+from app.config import (
+    DATABASE_ECHO,
+    DATABASE_MAX_OVERFLOW,
+    DATABASE_POOL_PRE_PING,
+    DATABASE_POOL_RECYCLE,
+    DATABASE_POOL_SIZE,
+    DATABASE_STATEMENT_TIMEOUT,
+    DATABASE_URL,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_CACHE_SIZE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_PROFILE,
+)
 
+# Drivers of the synchronous and asynchronous engines, per backend
+DRIVERS = {
+    "sqlite": ("pysqlite", "aiosqlite"),
+    "postgresql": ("psycopg", "asyncpg"),
+}
 
-def get_session():
-    with Session(engine) as session:
+# INSERT constructs of each backend, which support ON CONFLICT clauses
+DIALECT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+SQLITE_PROFILES = ("performance", "default")
+# Pragmas of the SQLite "performance" profile, set on every connection
+SQLITE_PERFORMANCE_PRAGMAS = {
+    # Readers see the last commit instead of waiting for the writer
+    "journal_mode": "WAL",
+    # Only the last commits can be lost on power failure in WAL mode, never the database
+    "synchronous": "NORMAL",
+    "busy_timeout": SQLITE_BUSY_TIMEOUT,
+    "mmap_size": SQLITE_MMAP_SIZE,
+    # Negative sizes are in KiB rather than in pages
+    "cache_size": -SQLITE_CACHE_SIZE,
+    "temp_store": "MEMORY",
+}
+
+
+def get_database_urls(database_url: str) -> tuple[URL, URL]:
+    """
+    Get the URLs of the synchronous and asynchronous engines.
+
+    The driver of the given URL, if any, is replaced by the ones the app is built with.
+    Args:
+        database_url: The URL of the database.
+    Returns:
+        The URLs of the synchronous and asynchronous engines.
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in DRIVERS:
+        raise ValueError(f"Unsupported database backend: {backend}")
+    sync_driver, async_driver = DRIVERS[backend]
+    return (
+        url.set(drivername=f"{backend}+{sync_driver}"),
+        url.set(drivername=f"{backend}+{async_driver}"),
+    )
+
+
+def get_connect_args(url: URL) -> dict:
+    """
+    Get the arguments the DBAPI connections of an engine are opened with.
+
+    Args:
+        url: The URL of the engine.
+    Returns:
+        The connection arguments.
+    """
+    if url.get_backend_name() == "sqlite":
+        # Connections are shared between the event loop and the worker threads
+        return {"check_same_thread": False}
+    if not DATABASE_STATEMENT_TIMEOUT:
+        return {}
+    statement_timeout = str(int(DATABASE_STATEMENT_TIMEOUT * 1000))
+    if url.get_driver_name() == "asyncpg":
+        return {"server_settings": {"statement_timeout": statement_timeout}}
+    return {"options": f"-c statement_timeout={statement_timeout}"}
+
+
+def get_engine_options(url: URL, poolclass: type[Pool]) -> dict:
+    return {
+        "echo": DATABASE_ECHO,
+        "connect_args": get_connect_args(url),
+        # Set explicitly, aiosqlite engines would not pool connections otherwise
+        "poolclass": poolclass,
+        "pool_size": DATABASE_POOL_SIZE,
+        "max_overflow": DATABASE_MAX_OVERFLOW,
+        "pool_pre_ping": DATABASE_POOL_PRE_PING,
+        "pool_recycle": DATABASE_POOL_RECYCLE,
+    }
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PERFORMANCE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def configure_sqlite(engine: Engine) -> None:
+    """
+    Apply the SQLite profile to the connections of an engine.
+
+    Args:
+        engine: The engine, engines of other backends are left untouched.
+    """
+    if engine.url.get_backend_name() != "sqlite":
+        return
+    if SQLITE_PROFILE not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile: {SQLITE_PROFILE}")
+    if SQLITE_PROFILE == "performance":
+        event.listen(engine, "connect", set_sqlite_pragmas)
+
+
+sync_url, async_url = get_database_urls(DATABASE_URL)
+# Used by the background workers, which run in threads
+engine = create_engine(sync_url, **get_engine_options(sync_url, QueuePool))
+# Used by the request handlers, so that queries do not block the event loop
+async_engine = create_async_engine(
+    async_url, **get_engine_options(async_url, AsyncAdaptedQueuePool)
+)
+configure_sqlite(engine)
+configure_sqlite(async_engine.sync_engine)
+
+
+def dialect_insert(table: type[SQLModel] | Table):
+    """
+    Build an INSERT statement of the database's backend, so that conflicts on unique
+    columns can be resolved by the database itself (ON CONFLICT DO NOTHING/UPDATE).
+
+    Args:
+        table: The model or table to insert into.
+    Returns:
+        The INSERT statement.
+    """
+    return DIALECT_INSERTS[engine.dialect.name](table)
+
+
+def get_write_lock() -> AbstractAsyncContextManager:
+    """
+    Get the lock serializing the short write transactions of the request handlers.
+
+    SQLite has a single writer, which the other writers poll for with growing sleeps:
+    queuing them in the event loop instead hands the database over in order and as soon
+    as it is released. Other backends lock rows, and need no lock.
+    Returns:
+        The lock, or a context manager doing nothing.
+    """
+    if engine.dialect.name == "sqlite":
+        return asyncio.Lock()
+    return nullcontext()
+
+
+write_lock = get_write_lock()
+
+
+async def get_session():
+    # Objects are still used once committed, and cannot be lazily reloaded with asyncio
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
         yield session
 
 
+# Columns added to tables after their creation, create_all only creates missing tables
+ADDED_COLUMNS = {
+    "user": {"roles_version": "INTEGER NOT NULL DEFAULT 0"},
+}
+
+
+def add_missing_columns():
+    """
+    Add the columns of ADDED_COLUMNS missing from the tables of an existing database.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table, columns in ADDED_COLUMNS.items():
+            if not inspector.has_table(table):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table)}
+            for column, definition in columns.items():
+                if column not in existing:
+                    connection.execute(
+                        text(f'ALTER TABLE "{table}" ADD COLUMN {column} {definition}')
+                    )
+
+
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    add_missing_columns()
@@ -1,15 +1,18 @@
 from fastapi import HTTPException, status
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.exc import NoResultFound
 
-from app.database import engine
+from app.database import async_engine
 from app.users.models import User
 
 
 async def get_user_by_username(username: str) -> User:
-    with Session(engine) as session:
+    async with AsyncSession(async_engine) as session:
         try:
-            user = session.exec(select(User).where(User.username == username)).one()
+            user = (
+                await session.exec(select(User).where(User.username == username))
+            ).one()
             return user
         except NoResultFound:
             raise HTTPException(
@@ -0,0 +1,8 @@
+import os
+
+# Connection pooling for the SMTP server (see app.emails.pool).
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 4))
+SMTP_POOL_TIMEOUT = float(os.getenv("SMTP_POOL_TIMEOUT", 30))
+SMTP_POOL_NOOP_AFTER = float(os.getenv("SMTP_POOL_NOOP_AFTER", 30))
+SMTP_POOL_MAX_LIFETIME = float(os.getenv("SMTP_POOL_MAX_LIFETIME", 300))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", 30))
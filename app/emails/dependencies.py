@@ -1,10 +1,14 @@
 from app.emails.services import EmailService
 from app.emails.services import EmailServiceSecure
 
+# Shared instances, so that every request reuses the same SMTP connection pools
+email_service = EmailService()
+email_service_secure = EmailServiceSecure()
+
 
 def get_email_service():
-    return EmailService()
+    return email_service
 
 
 def get_email_service_secure():
-    return EmailServiceSecure()
+    return email_service_secure
@@ -0,0 +1,125 @@
+import smtplib
+import socket
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+from app.emails.config import (
+    SMTP_POOL_MAX_LIFETIME,
+    SMTP_POOL_NOOP_AFTER,
+    SMTP_POOL_SIZE,
+    SMTP_POOL_TIMEOUT,
+)
+
+
+class SMTPConnectionPool:
+    """
+    Pool of persistent SMTP connections.
+
+    Connections are opened (and authenticated) by the given factory, kept alive between
+    messages and shared by the threads sending emails. A connection which has been idle for
+    more than noop_after seconds is checked with NOOP before being reused, and connections
+    older than max_lifetime are closed. At most size connections are open at once.
+
+    Attributes:
+        connect: Factory opening a new, ready to use, SMTP connection.
+        size: The maximum number of open connections.
+        timeout: The number of seconds to wait for a free connection.
+        noop_after: The idle time after which a connection is checked before reuse.
+        max_lifetime: The age after which a connection is closed instead of reused.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], smtplib.SMTP],
+        size: int = SMTP_POOL_SIZE,
+        timeout: float = SMTP_POOL_TIMEOUT,
+        noop_after: float = SMTP_POOL_NOOP_AFTER,
+        max_lifetime: float = SMTP_POOL_MAX_LIFETIME,
+    ):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.noop_after = noop_after
+        self.max_lifetime = max_lifetime
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        # (connection, opened at, last used at), most recently used last
+        self.idle: deque[tuple[smtplib.SMTP, float, float]] = deque()
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        """
+        Borrow a connection from the pool.
+
+        The connection is returned to the pool afterwards, unless the server dropped it.
+        Raises:
+            TimeoutError: No connection became available within the pool's timeout.
+        """
+        if not self.slots.acquire(timeout=self.timeout):
+            raise TimeoutError("No SMTP connection available")
+        try:
+            server, opened_at = self.checkout()
+            try:
+                yield server
+            except (smtplib.SMTPServerDisconnected, ConnectionError, socket.timeout):
+                self.discard(server)
+                raise
+            except smtplib.SMTPException:
+                # The server rejected the message, the connection itself is still usable.
+                # SMTPException subclasses OSError, so it is caught before OSError.
+                self.checkin(server, opened_at)
+                raise
+            except OSError:
+                self.discard(server)
+                raise
+            except BaseException:
+                self.checkin(server, opened_at)
+                raise
+            self.checkin(server, opened_at)
+        finally:
+            self.slots.release()
+
+    def checkout(self) -> tuple[smtplib.SMTP, float]:
+        now = time.monotonic()
+        while True:
+            with self.lock:
+                if not self.idle:
+                    break
+                server, opened_at, last_used = self.idle.pop()
+            if now - opened_at > self.max_lifetime:
+                self.discard(server)
+                continue
+            if now - last_used > self.noop_after and not self.is_alive(server):
+                self.discard(server)
+                continue
+            return server, opened_at
+        return self.connect(), time.monotonic()
+
+    def checkin(self, server: smtplib.SMTP, opened_at: float) -> None:
+        with self.lock:
+            self.idle.append((server, opened_at, time.monotonic()))
+
+    def is_alive(self, server: smtplib.SMTP) -> bool:
+        try:
+            code, _ = server.noop()
+        except (smtplib.SMTPException, OSError):
+            return False
+        return code == 250
+
+    def discard(self, server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def close(self) -> None:
+        """
+        Close every idle connection.
+        """
+        with self.lock:
+            idle, self.idle = self.idle, deque()
+        for server, _, _ in idle:
+            self.discard(server)
@@ -1,9 +1,15 @@
 import os
 import smtplib
 import ssl
+from collections import deque
+from collections.abc import Callable
+from email.message import Message
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
+from app.emails.config import SMTP_TIMEOUT
+from app.emails.pool import SMTPConnectionPool
+
 
 class EmailService:
     """
@@ -11,19 +17,31 @@ class EmailService:
 
     This class is responsible for sending emails to employees.
     It uses the SMTP server provided in the environment variables to send emails.
+    Connections to the server are pooled and reused across emails.
 
     Attributes:
         server_address: The address of the SMTP server.
         port: The port of the SMTP server.
         email_address: The email address of the sender.
+        pool: The pool of connections to the SMTP server.
     """
 
     def __init__(self):
         self.server_address: str = os.getenv("SMTP_SERVER_ADDRESS")  # type: ignore
         self.port: int = os.getenv("SMTP_PORT")  # type: ignore
         self.email_address: str = os.getenv("SMTP_EMAIL_ADDRESS")  # type: ignore
+        self.pool = SMTPConnectionPool(self.connect)
+
+    def connect(self) -> smtplib.SMTP:
+        """
+        Opens a new connection to the SMTP server.
+
+        Returns:
+            The connection, ready to send emails.
+        """
+        return smtplib.SMTP(self.server_address, self.port, timeout=SMTP_TIMEOUT)
 
-    def send_email(self, message: MIMEMultipart, receiver_email: str) -> None:
+    def send_email(self, message: Message, receiver_email: str) -> None:
         """
         Sends an email to the employee.
 
@@ -31,8 +49,58 @@ class EmailService:
             message: The email message to be sent.
             receiver_email: The email address of the employee.
         """
-        with smtplib.SMTP(self.server_address, self.port) as server:
-            server.sendmail(self.email_address, receiver_email, message.as_string())
+        (error,) = self.send_emails([(message.as_string(), receiver_email)])
+        if error is not None:
+            raise error
+
+    def send_emails(
+        self,
+        emails: list[tuple[str, str]],
+        before_send: Callable[[int], None] | None = None,
+    ) -> list[Exception | None]:
+        """
+        Sends several emails back to back over a single pooled connection.
+
+        If the connection turns out to have been dropped by the server, the remaining
+        emails are sent over a new connection.
+        Args:
+            emails: The serialized email messages to be sent, along with the email address
+                of their receiver.
+            before_send: Called before each email with the number of emails already
+                processed, typically to keep a long batch claimed.
+        Returns:
+            For each email, the error which prevented its delivery, or None if it was sent.
+        """
+        errors: list[Exception | None] = []
+        pending = deque(emails)
+        reconnected = False
+        while pending:
+            try:
+                with self.pool.connection() as server:
+                    while pending:
+                        message, receiver_email = pending[0]
+                        if before_send is not None:
+                            before_send(len(errors))
+                        try:
+                            server.sendmail(self.email_address, receiver_email, message)
+                            errors.append(None)
+                        except smtplib.SMTPServerDisconnected:
+                            raise
+                        except smtplib.SMTPException as e:
+                            errors.append(e)
+                        pending.popleft()
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                if reconnected:
+                    errors.extend(e for _ in pending)
+                    break
+                reconnected = True
+        return errors
+
+    def close(self) -> None:
+        """
+        Closes the idle connections to the SMTP server.
+        """
+        self.pool.close()
 
     def create_email(self, receiver_email: str, email_code: str) -> MIMEMultipart:
         """
@@ -70,9 +138,13 @@ class EmailServiceSecure(EmailService):
         self.password: str = os.getenv("SMTP_SERVER_PASSWORD")  # type: ignore
         self.context = ssl.create_default_context()
 
-    def send_email(self, message: MIMEMultipart, receiver_email: str) -> None:
-        with smtplib.SMTP_SSL(
-            self.server_address, self.port, context=self.context
-        ) as server:
+    def connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP_SSL(
+            self.server_address, self.port, context=self.context, timeout=SMTP_TIMEOUT
+        )
+        try:
             server.login(self.email_address, self.password)
-            server.sendmail(self.email_address, receiver_email, message.as_string())
+        except smtplib.SMTPException:
+            server.close()
+            raise
+        return server
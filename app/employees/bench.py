@@ -0,0 +1,232 @@
+import argparse
+import asyncio
+import io
+import time
+from uuid import uuid4
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from fastapi import UploadFile
+from sqlalchemy import event, insert
+from sqlmodel import Session, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import async_engine, create_db_and_tables, engine
+from app.emails.dependencies import get_email_service
+from app.employees.cache import employee_cache
+from app.employees.models import (
+    EmailOutbox,
+    Employee,
+    EmployeeCreate,
+    EmployeeIdentifier,
+    EmployeeImportReport,
+    EmployeeState,
+)
+from app.employees.services import EmployeeAdminService, EmployeeService
+
+# Benchmarks write to the database at DATABASE_URL, their employees are prefixed with
+# BENCHMARK_PREFIX and deleted once measured
+BENCHMARK_PREFIX = "BENCH-"
+# The per-row import takes minutes past this number of rows
+PER_ROW_MAX_ROWS = 10_000
+
+
+def make_employee(i: int) -> EmployeeCreate:
+    return EmployeeCreate(
+        internal_id=f"{BENCHMARK_PREFIX}{i}",
+        email=f"bench{i}@example.com",
+        code_to_print=f"{BENCHMARK_PREFIX}{i}",
+        surname="Surname",
+        firstname="Firstname",
+    )
+
+
+def make_csv_file(rows: int) -> UploadFile:
+    lines = ["internal_id,email,code_to_print,surname,firstname"]
+    for i in range(rows):
+        employee = make_employee(i)
+        lines.append(
+            f"{employee.internal_id},{employee.email},{employee.code_to_print},"
+            f"{employee.surname},{employee.firstname}"
+        )
+    data = "\n".join(lines).encode()
+    return UploadFile(io.BytesIO(data), size=len(data), filename="bench.csv")
+
+
+def delete_benchmark_employees() -> None:
+    with Session(engine) as session:
+        for table in (EmailOutbox, EmployeeState, Employee):
+            session.exec(
+                delete(table).where(
+                    table.internal_id.startswith(BENCHMARK_PREFIX)  # type: ignore
+                )
+            )
+        session.commit()
+
+
+async def measure_per_row_import(rows: int) -> float:
+    """
+    Measure how long creating employees one by one takes, as upload-csv used to.
+
+    Args:
+        rows: The number of employees.
+    Returns:
+        The elapsed time, in seconds.
+    """
+    employees = [make_employee(i) for i in range(rows)]
+    start = time.perf_counter()
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        service = EmployeeAdminService(session)
+        for employee in employees:
+            await service.create_new_employee(employee)
+    return time.perf_counter() - start
+
+
+async def measure_bulk_import(rows: int) -> float:
+    """
+    Measure how long importing a CSV file takes, as upload-csv does.
+
+    CSV parsing and validation are included in the elapsed time.
+    Args:
+        rows: The number of rows of the file.
+    Returns:
+        The elapsed time, in seconds.
+    """
+    file = make_csv_file(rows)
+    report = EmployeeImportReport()
+    start = time.perf_counter()
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        service = EmployeeAdminService(session)
+        async for employees in service.parse_csv_file(file, report):
+            await service.import_employees(employees, report, commit=False)
+        await session.commit()
+    elapsed = time.perf_counter() - start
+    assert report.created == rows, report
+    return elapsed
+
+
+async def benchmark_import(sizes: list[int]) -> None:
+    print("rows    per-row (s)  bulk (s)")
+    for rows in sizes:
+        per_row = None
+        if rows <= PER_ROW_MAX_ROWS:
+            per_row = await measure_per_row_import(rows)
+            delete_benchmark_employees()
+        bulk = await measure_bulk_import(rows)
+        delete_benchmark_employees()
+        per_row_column = f"{per_row:>11.2f}" if per_row is not None else f"{'-':>11}"
+        print(f"{rows:>7}  {per_row_column}  {bulk:>8.2f}")
+
+
+class StatementCounter:
+    """
+    Count the statements and commits run by the asynchronous engine.
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.commits = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self.count)
+        event.listen(async_engine.sync_engine, "commit", self.count_commit)
+
+    def count(self, *args) -> None:
+        self.statements += 1
+
+    def count_commit(self, *args) -> None:
+        self.commits += 1
+
+    def reset(self) -> None:
+        self.statements = 0
+        self.commits = 0
+
+
+async def send_code(i: int) -> float:
+    """
+    Send a verification code to a benchmark employee, as the send-email route does.
+
+    Args:
+        i: The number of the employee.
+    Returns:
+        The elapsed time, in seconds.
+    """
+    start = time.perf_counter()
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        service = EmployeeService(session, get_email_service())
+        employee = await service.get_employee_by_identifier(
+            EmployeeIdentifier(internal_id=f"{BENCHMARK_PREFIX}{i}")
+        )
+        await service.generate_and_send_email(employee)
+    return time.perf_counter() - start
+
+
+async def benchmark_send_code(requests: int, concurrency: int) -> None:
+    """
+    Send verification codes to employees without a state, then to the same employees
+    again, now with a state.
+
+    Args:
+        requests: The number of codes sent in each run, one per employee.
+        concurrency: The number of codes sent at once.
+    """
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Employee),
+            [make_employee(i).model_dump() | {"id": uuid4()} for i in range(requests)],
+        )
+    counter = StatementCounter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited_send_code(i: int) -> float:
+        async with semaphore:
+            return await send_code(i)
+
+    print("states    stmts/req  commits/req  p50 (ms)  p99 (ms)  req/s")
+    for states in ("new", "existing"):
+        # Every run looks the employees up in the database
+        employee_cache.clear()
+        counter.reset()
+        start = time.perf_counter()
+        latencies = sorted(
+            await asyncio.gather(*(limited_send_code(i) for i in range(requests)))
+        )
+        elapsed = time.perf_counter() - start
+        print(
+            f"{states:<8}  {counter.statements / requests:>9.2f}"
+            f"  {counter.commits / requests:>11.2f}"
+            f"  {latencies[requests // 2] * 1000:>8.1f}"
+            f"  {latencies[int(requests * 0.99)] * 1000:>8.1f}"
+            f"  {requests / elapsed:>5.0f}"
+        )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the employee services.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser(
+        "import", help="Compare the per-row and the bulk CSV imports."
+    )
+    import_parser.add_argument(
+        "rows", nargs="*", type=int, default=[1_000, 10_000, 100_000]
+    )
+    send_code_parser = commands.add_parser(
+        "send-code", help="Measure the statements and latency of sending codes."
+    )
+    send_code_parser.add_argument("--requests", type=int, default=2000)
+    send_code_parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    create_db_and_tables()
+    delete_benchmark_employees()
+    try:
+        if args.command == "import":
+            await benchmark_import(args.rows)
+        elif args.command == "send-code":
+            await benchmark_send_code(args.requests, args.concurrency)
+        delete_benchmark_employees()
+    finally:
+        # Pooled aiosqlite connections run in threads which would keep the process alive
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
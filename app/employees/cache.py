@@ -0,0 +1,125 @@
+import time
+from collections import OrderedDict
+
+from app.employees.config import EMPLOYEE_CACHE_MAX_SIZE, EMPLOYEE_CACHE_TTL
+from app.employees.models import Employee, EmployeeCacheStats
+from app.employees.schemas import EmployeeAttribute
+
+
+class EmployeeCache:
+    """
+    Least recently used, time-to-live cache of the employee directory, keyed by internal
+    ID and by email.
+
+    Every kiosk interaction starts by looking the employee up by the identifier they
+    entered, in a roster which barely changes during an event. Employees are cached as
+    column values and handed out as new detached instances, so that no session ever
+    shares or modifies a cached employee. Unknown identifiers are not cached. The
+    employee services invalidate entries once an update or a deletion is committed, and
+    clear the cache after bulk imports. The cache is local to the process: changes made
+    by other processes show up once entries expire. Only used from the event loop, so it
+    needs no lock.
+
+    Attributes:
+        ttl: The maximum number of seconds an entry is kept.
+        max_size: The maximum number of employees, the least recently used are evicted
+            first.
+        hits: The number of lookups which found an employee.
+        misses: The number of lookups which did not find an employee.
+    """
+
+    def __init__(
+        self, ttl: float = EMPLOYEE_CACHE_TTL, max_size: int = EMPLOYEE_CACHE_MAX_SIZE
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.entries: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        # Internal IDs of the cached employees, by email
+        self.emails: dict[str, str] = {}
+        # Bumped by invalidate and clear, so that an employee read before is not cached
+        self.version = 0
+
+    def get(self, attribute: EmployeeAttribute, value: str) -> Employee | None:
+        """
+        Look up an employee.
+
+        Args:
+            attribute: The attribute to look the employee up by, internal ID or email.
+            value: The value of the attribute.
+        Returns:
+            A detached copy of the employee, or None if it is not cached or has expired.
+        """
+        internal_id = value
+        if attribute == EmployeeAttribute.EMAIL:
+            internal_id = self.emails.get(value, "")
+        entry = self.entries.get(internal_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        values, expires_at = entry
+        if expires_at <= time.monotonic():
+            self.discard(internal_id)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(internal_id)
+        self.hits += 1
+        # Values were validated when read from the database
+        return Employee(**values)
+
+    def put(self, employee: Employee, version: int) -> None:
+        """
+        Cache an employee, evicting the least recently used employees if needed.
+
+        Args:
+            employee: The employee, as read from the database.
+            version: The version of the cache when the employee was read, the employee is
+                not cached if it has been invalidated since.
+        """
+        if self.ttl <= 0 or version != self.version:
+            return
+        self.discard(employee.internal_id)
+        self.entries[employee.internal_id] = (
+            employee.model_dump(),
+            time.monotonic() + self.ttl,
+        )
+        self.emails[str(employee.email)] = employee.internal_id
+        while len(self.entries) > self.max_size:
+            self.discard(next(iter(self.entries)))
+
+    def invalidate(self, *keys: str) -> None:
+        """
+        Remove cached employees.
+
+        Args:
+            keys: The internal IDs or emails of the employees, as they were before being
+                updated or deleted.
+        """
+        self.version += 1
+        for key in keys:
+            self.discard(self.emails.get(key, key))
+
+    def clear(self) -> None:
+        self.version += 1
+        self.entries.clear()
+        self.emails.clear()
+
+    def stats(self) -> EmployeeCacheStats:
+        return EmployeeCacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            entries=len(self.entries),
+            max_size=self.max_size,
+        )
+
+    def discard(self, internal_id: str) -> None:
+        entry = self.entries.pop(internal_id, None)
+        if entry is None:
+            return
+        email = str(entry[0]["email"])
+        if self.emails.get(email) == internal_id:
+            del self.emails[email]
+
+
+employee_cache = EmployeeCache()
@@ -0,0 +1,42 @@
+import os
+
+EMPLOYEE_CSV_FIELDS = ("internal_id", "email", "code_to_print", "surname", "firstname")
+
+# Number of rows per set query and per multi-row INSERT during bulk imports.
+# Kept well below SQLite's bound parameter limit (6 columns per row).
+IMPORT_BATCH_SIZE = 100
+
+# Number of bytes read from an uploaded CSV file at a time.
+CSV_READ_CHUNK_SIZE = 64 * 1024
+
+# Columns of the exports, employee exports can be uploaded back as CSV files.
+EMPLOYEE_EXPORT_FIELDS = ("id",) + EMPLOYEE_CSV_FIELDS
+EMPLOYEE_STATE_EXPORT_FIELDS = (
+    "id",
+    "internal_id",
+    "code_to_print",
+    "email_code_validated",
+    "email_code_sent",
+)
+# Number of rows fetched from the database and written to the response at a time.
+EXPORT_BATCH_SIZE = 1000
+
+# Employees looked up by the kiosk routes (see app.employees.cache).
+EMPLOYEE_CACHE_TTL = float(os.getenv("EMPLOYEE_CACHE_TTL", 300))
+EMPLOYEE_CACHE_MAX_SIZE = int(os.getenv("EMPLOYEE_CACHE_MAX_SIZE", 10000))
+
+# Background delivery of queued emails (see app.employees.workers).
+EMAIL_OUTBOX_WORKERS = int(os.getenv("EMAIL_OUTBOX_WORKERS", 2))
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 50))
+EMAIL_OUTBOX_POLL_INTERVAL = float(os.getenv("EMAIL_OUTBOX_POLL_INTERVAL", 5))
+# Claimed emails are leased to their worker, which renews the lease between emails: it
+# must outlast the delivery of one email, a few SMTP calls of up to SMTP_TIMEOUT each.
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", 300))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 5))
+EMAIL_OUTBOX_BACKOFF_SECONDS = int(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", 10))
+EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = int(
+    os.getenv("EMAIL_OUTBOX_MAX_BACKOFF_SECONDS", 600)
+)
+
+# Number of employees whose states and emails are created at once by a campaign.
+EMAIL_CAMPAIGN_BATCH_SIZE = 100
@@ -0,0 +1,5 @@
+from app.employees.workers import EmailOutboxWorkers, email_outbox_workers
+
+
+def get_email_outbox_workers() -> EmailOutboxWorkers:
+    return email_outbox_workers
@@ -1,6 +1,13 @@
+from datetime import datetime
 from pydantic import EmailStr, validate_call
-from sqlmodel import SQLModel, Field, String
+from sqlmodel import SQLModel, Field, Index, String
 from uuid import UUID
+from app.employees.schemas import (
+    EmailCampaignTarget,
+    EmailOutboxStatus,
+    EmployeeImportStatus,
+)
+from app.helpers import utcnow
 
 
 class EmployeeBase(SQLModel):
@@ -43,6 +50,69 @@ class EmployeeStateRead(EmployeeStateBase):
     id: UUID
 
 
+class EmailOutbox(SQLModel, table=True):
+    """
+    Email waiting to be delivered by the outbox workers.
+
+    Workers claim due emails by setting locked_by/locked_until, so that an email whose
+    worker died (or whose server restarted) is picked up again once the lease expires.
+    """
+
+    __table_args__ = (
+        # Looking up an employee's queued emails, and claiming due emails
+        Index("ix_emailoutbox_internal_id_status", "internal_id", "status"),
+        Index("ix_emailoutbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id: UUID | None = Field(default=None, primary_key=True)
+    internal_id: str = Field(foreign_key="employee.internal_id")
+    campaign_id: UUID | None = Field(
+        default=None, index=True, foreign_key="emailcampaign.id"
+    )
+    receiver_email: str
+    message: str
+    status: EmailOutboxStatus = EmailOutboxStatus.PENDING
+    attempts: int = 0
+    last_error: str | None = None
+    next_attempt_at: datetime = Field(default_factory=utcnow)
+    locked_by: UUID | None = None
+    locked_until: datetime | None = None
+    created_at: datetime = Field(default_factory=utcnow)
+    sent_at: datetime | None = None
+
+
+class EmailCampaign(SQLModel, table=True):
+    id: UUID | None = Field(default=None, primary_key=True)
+    target: EmailCampaignTarget
+    total: int = 0
+    created_at: datetime = Field(default_factory=utcnow)
+
+
+class EmailCampaignCreate(SQLModel, table=False):
+    target: EmailCampaignTarget
+    internal_ids: list[str] | None = None
+
+    @validate_call
+    def __init__(self, **data):
+        super().__init__(**data)
+        if self.target == EmailCampaignTarget.IDS and not self.internal_ids:
+            raise ValueError("internal_ids must be provided for an ids campaign")
+        if self.target != EmailCampaignTarget.IDS and self.internal_ids:
+            raise ValueError("internal_ids should only be provided for an ids campaign")
+
+
+class EmailCampaignRead(SQLModel):
+    id: UUID
+    target: EmailCampaignTarget
+    total: int
+    pending: int
+    sent: int
+    failed: int
+    created_at: datetime
+    last_sent_at: datetime | None
+    emails_per_second: float | None
+
+
 class EmployeeIdentifier(SQLModel, table=False):
     internal_id: str | None = None
     email: EmailStr | None = None
@@ -54,3 +124,31 @@ class EmployeeIdentifier(SQLModel, table=False):
             raise ValueError("Either internal_id or email must be provided")
         if self.internal_id and self.email:
             raise ValueError("Only one of internal_id or email should be provided")
+
+
+class EmployeeImportRow(SQLModel, table=False):
+    line: int
+    status: EmployeeImportStatus
+    internal_id: str | None = None
+    detail: str | None = None
+
+
+class EmployeeImportReport(SQLModel, table=False):
+    created: int = 0
+    conflicts: int = 0
+    rejected: int = 0
+    rows: list[EmployeeImportRow] = []
+
+    def add_row(self, row: EmployeeImportRow) -> None:
+        if row.status == EmployeeImportStatus.CONFLICT:
+            self.conflicts += 1
+        elif row.status == EmployeeImportStatus.REJECTED:
+            self.rejected += 1
+        self.rows.append(row)
+
+
+class EmployeeCacheStats(SQLModel, table=False):
+    hits: int
+    misses: int
+    entries: int
+    max_size: int
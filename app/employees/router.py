@@ -1,85 +1,211 @@
+from collections.abc import AsyncIterator
 from typing import Annotated
 from uuid import UUID
 from fastapi import (
     APIRouter,
     Depends,
+    Query,
     UploadFile,
     HTTPException,
+    Response,
     Security,
     status,
 )
+from fastapi.responses import StreamingResponse
 from pydantic import EmailStr
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.auth.dependencies import validate_token
 from app.auth.models import TokenData
-from app.database import get_session
+from app.counts import row_counts
+from app.database import async_engine, get_session
 from app.emails.dependencies import get_email_service
 from app.emails.services import EmailService
+from app.employees.cache import employee_cache
+from app.employees.dependencies import get_email_outbox_workers
 from app.employees.models import (
+    EmailCampaignCreate,
+    EmailCampaignRead,
+    Employee,
+    EmployeeCacheStats,
     EmployeeCreate,
     EmployeeIdentifier,
+    EmployeeImportReport,
     EmployeeRead,
+    EmployeeState,
     EmployeeStateRead,
 )
-from app.employees.schemas import EmployeeAttribute, EmployeeStateAttribute
-from app.employees.services import EmployeeAdminService, EmployeeService
+from app.employees.config import EMPLOYEE_EXPORT_FIELDS, EMPLOYEE_STATE_EXPORT_FIELDS
+from app.employees.schemas import (
+    EmployeeAttribute,
+    EmployeeStateAttribute,
+    ExportFormat,
+)
+from app.employees.services import (
+    EmailCampaignService,
+    EmployeeAdminService,
+    EmployeeService,
+)
+from app.employees.workers import EmailOutboxWorkers
+from app.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from app.qrcodes.dependencies import get_qr_code_warmup
+from app.qrcodes.encoders import QR_CODE_ENCODERS
+from app.qrcodes.models import QRCodeOptions
+from app.qrcodes.schemas import QRCodeFormat
+from app.qrcodes.warmup import QRCodeWarmup
 
 router = APIRouter(
     prefix="/employees",
     tags=["employees"],
 )
 
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+async def stream_export(
+    model: type[Employee] | type[EmployeeState],
+    fields: tuple[str, ...],
+    format: ExportFormat,
+) -> AsyncIterator[bytes]:
+    # The response is streamed once the route has returned, give it its own session
+    async with AsyncSession(async_engine) as session:
+        admin_service = EmployeeAdminService(session)
+        async for chunk in admin_service.export_rows(model, fields, format):
+            yield chunk
+
 
 @router.post("/send-email", response_model=EmployeeStateRead)
 async def send_verification_email(
     employee_identifier: EmployeeIdentifier,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
     email_service: Annotated[EmailService, Depends(get_email_service)],
+    outbox_workers: Annotated[EmailOutboxWorkers, Depends(get_email_outbox_workers)],
 ):
     service = EmployeeService(session, email_service)
-    if employee_identifier.internal_id:
-        employee = service.get_employee_by_attribute(
-            EmployeeAttribute.INTERNAL_ID, employee_identifier.internal_id
-        )
-    else:
-        employee = service.get_employee_by_attribute(
-            EmployeeAttribute.EMAIL, str(employee_identifier.email)
-        )
-    return service.generate_and_send_email(employee)
+    employee = await service.get_employee_by_identifier(employee_identifier)
+    state = await service.generate_and_send_email(employee)
+    outbox_workers.notify()
+    return state
+
+
+@router.post(
+    "/qr-code",
+    response_class=Response,
+    responses={
+        200: {
+            "content": {
+                "image/png": {},
+                "image/svg+xml": {},
+                "application/octet-stream": {},
+            }
+        }
+    },
+)
+async def get_qr_code(
+    employee_identifier: EmployeeIdentifier,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    email_service: Annotated[EmailService, Depends(get_email_service)],
+    format: QRCodeFormat = QRCodeFormat.PNG,
+):
+    service = EmployeeService(session, email_service)
+    employee = await service.get_employee_by_identifier(employee_identifier)
+    try:
+        image = await service.get_qr_code(employee, QRCodeOptions(format=format))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    return Response(content=image, media_type=QR_CODE_ENCODERS[format].media_type)
 
 
-@router.post("/upload-csv")
+@router.post("/upload-csv", response_model=EmployeeImportReport)
 async def upload_csv(
     file: UploadFile,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
+    qr_code_warmup: Annotated[QRCodeWarmup, Depends(get_qr_code_warmup)],
 ):
     admin_service = EmployeeAdminService(session)
-    employees = await admin_service.parse_csv_file(file)
+    report = EmployeeImportReport()
+
+    try:
+        async for employees in admin_service.parse_csv_file(file, report):
+            await admin_service.import_employees(employees, report, commit=False)
+        await session.commit()
+        if report.created:
+            row_counts.invalidate(Employee)
+            employee_cache.clear()
+            qr_code_warmup.trigger()
+        return report
+    except HTTPException as e:
+        await session.rollback()
+        raise e
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
 
+
+@router.post("/campaigns", response_model=EmailCampaignRead)
+async def create_email_campaign(
+    campaign: EmailCampaignCreate,
+    token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    email_service: Annotated[EmailService, Depends(get_email_service)],
+    outbox_workers: Annotated[EmailOutboxWorkers, Depends(get_email_outbox_workers)],
+):
+    service = EmailCampaignService(session, email_service)
     try:
-        for employee in employees:
-            # implement batch processing instead, this is slow
-            admin_service.create_new_employee(employee)
+        db_campaign = await service.create_campaign(campaign)
+        outbox_workers.notify()
+        return await service.get_campaign(db_campaign.id)  # type: ignore
     except HTTPException as e:
-        session.rollback()
+        await session.rollback()
         raise e
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
 
 
+@router.get("/campaigns/id/{id}", response_model=EmailCampaignRead)
+async def get_email_campaign_by_id(
+    id: UUID,
+    token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    email_service: Annotated[EmailService, Depends(get_email_service)],
+):
+    service = EmailCampaignService(session, email_service)
+    try:
+        return await service.get_campaign(id)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e),
+        )
+
+
+@router.get("/cache", response_model=EmployeeCacheStats)
+async def get_employee_cache_stats(
+    token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
+):
+    return employee_cache.stats()
+
+
 @router.post("/", response_model=EmployeeRead)
 async def create_employee(
     employee: EmployeeCreate,
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     admin_service = EmployeeAdminService(session)
     try:
-        new_employee = admin_service.create_new_employee(employee)
+        new_employee = await admin_service.create_new_employee(employee)
         return new_employee
     except HTTPException as e:
         raise e
@@ -95,11 +221,11 @@ async def create_employee(
 async def get_employee_by_id(
     id: UUID,
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     admin_service = EmployeeAdminService(session)
     try:
-        employee = admin_service.get_employee_by_attribute(
+        employee = await admin_service.get_employee_by_attribute(
             EmployeeAttribute.ID, str(id)
         )
         return employee
@@ -116,11 +242,23 @@ async def get_employee_by_id(
 @router.get("/all", response_model=list[EmployeeRead])
 async def get_all_employees(
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    response: Response,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    cursor: str | None = None,
+    include_total: bool = False,
 ):
     admin_service = EmployeeAdminService(session)
     try:
-        employees = admin_service.get_employees()
+        employees, next_cursor = await admin_service.get_employees(
+            offset, limit, cursor
+        )
+        if next_cursor is not None:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        if include_total:
+            total_count = await admin_service.count_employees()
+            response.headers[TOTAL_COUNT_HEADER] = str(total_count)
         return employees
     except HTTPException as e:
         raise e
@@ -132,16 +270,30 @@ async def get_all_employees(
         )
 
 
+@router.get("/export")
+async def export_employees(
+    token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
+    format: ExportFormat = ExportFormat.NDJSON,
+):
+    return StreamingResponse(
+        stream_export(Employee, EMPLOYEE_EXPORT_FIELDS, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="employees.{format.value}"'
+        },
+    )
+
+
 @router.put("/id/{id}", response_model=EmployeeRead)
 async def update_employee_by_id(
     id: UUID,
     employee: EmployeeCreate,
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     admin_service = EmployeeAdminService(session)
     try:
-        updated_employee = admin_service.update_employee_by_attribute(
+        updated_employee = await admin_service.update_employee_by_attribute(
             EmployeeAttribute.ID, str(id), employee
         )
         return updated_employee
@@ -159,11 +311,11 @@ async def update_employee_by_id(
 async def delete_employee_by_id(
     id: UUID,
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     admin_service = EmployeeAdminService(session)
     try:
-        employee = admin_service.delete_employee_by_attribute(
+        employee = await admin_service.delete_employee_by_attribute(
             EmployeeAttribute.ID, str(id)
         )
         return employee
@@ -181,11 +333,11 @@ async def delete_employee_by_id(
 async def get_employee_state_by_id(
     id: UUID,
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     admin_service = EmployeeAdminService(session)
     try:
-        employee_state = admin_service.get_employee_state_by_attribute(
+        employee_state = await admin_service.get_employee_state_by_attribute(
             EmployeeStateAttribute.ID, str(id)
         )
         return employee_state
@@ -202,11 +354,23 @@ async def get_employee_state_by_id(
 @router.get("/state/all", response_model=list[EmployeeStateRead])
 async def get_all_employee_states(
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    response: Response,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    cursor: str | None = None,
+    include_total: bool = False,
 ):
     admin_service = EmployeeAdminService(session)
     try:
-        employee_states = admin_service.get_employee_states()
+        employee_states, next_cursor = await admin_service.get_employee_states(
+            offset, limit, cursor
+        )
+        if next_cursor is not None:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        if include_total:
+            total_count = await admin_service.count_employee_states()
+            response.headers[TOTAL_COUNT_HEADER] = str(total_count)
         return employee_states
     except HTTPException as e:
         raise e
@@ -218,15 +382,31 @@ async def get_all_employee_states(
         )
 
 
+@router.get("/state/export")
+async def export_employee_states(
+    token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
+    format: ExportFormat = ExportFormat.NDJSON,
+):
+    return StreamingResponse(
+        stream_export(EmployeeState, EMPLOYEE_STATE_EXPORT_FIELDS, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="employee-states.{format.value}"'
+            )
+        },
+    )
+
+
 @router.delete("/state/id/{id}", response_model=EmployeeStateRead)
 async def delete_employee_state_by_id(
     id: UUID,
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     admin_service = EmployeeAdminService(session)
     try:
-        employee_state = admin_service.delete_employee_state_by_attribute(
+        employee_state = await admin_service.delete_employee_state_by_attribute(
             EmployeeStateAttribute.ID, str(id)
         )
         return employee_state
@@ -9,3 +9,26 @@ class EmployeeAttribute(Enum):
 
 class EmployeeStateAttribute(Enum):
     ID = "id"
+
+
+class EmployeeImportStatus(Enum):
+    CREATED = "created"
+    CONFLICT = "conflict"
+    REJECTED = "rejected"
+
+
+class EmailOutboxStatus(Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class ExportFormat(Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class EmailCampaignTarget(Enum):
+    ALL = "all"
+    UNSENT = "unsent"
+    IDS = "ids"
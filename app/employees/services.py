@@ -1,20 +1,63 @@
+import asyncio
+import codecs
 import csv
 import hashlib
+import io
+import json
+import random
+from collections.abc import AsyncIterator, Sequence
+from datetime import timedelta
+from email.message import Message
 from io import TextIOWrapper
 from pathlib import Path
 from fastapi import HTTPException, UploadFile, status
-import qrcode
+from pydantic import ValidationError
 from uuid import UUID, uuid4
-from sqlmodel import Session, select
-from sqlalchemy.exc import MultipleResultsFound, NoResultFound
+from sqlmodel import Session, func, insert, or_, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.exc import IntegrityError, MultipleResultsFound, NoResultFound
 
+from app.employees.cache import employee_cache
+from app.employees.config import (
+    CSV_READ_CHUNK_SIZE,
+    EMAIL_CAMPAIGN_BATCH_SIZE,
+    EMAIL_OUTBOX_BACKOFF_SECONDS,
+    EMAIL_OUTBOX_LEASE_SECONDS,
+    EMAIL_OUTBOX_MAX_ATTEMPTS,
+    EMAIL_OUTBOX_MAX_BACKOFF_SECONDS,
+    EMPLOYEE_CSV_FIELDS,
+    EXPORT_BATCH_SIZE,
+    IMPORT_BATCH_SIZE,
+)
 from app.employees.models import (
+    EmailCampaign,
+    EmailCampaignCreate,
+    EmailCampaignRead,
+    EmailOutbox,
     Employee,
     EmployeeCreate,
+    EmployeeIdentifier,
+    EmployeeImportReport,
+    EmployeeImportRow,
     EmployeeState,
 )
-from app.employees.schemas import EmployeeAttribute, EmployeeStateAttribute
+from app.employees.schemas import (
+    EmailCampaignTarget,
+    EmailOutboxStatus,
+    EmployeeAttribute,
+    EmployeeImportStatus,
+    EmployeeStateAttribute,
+    ExportFormat,
+)
 from app.emails.services import EmailService
+from app.counts import row_counts
+from app.database import dialect_insert, write_lock
+from app.helpers import utcnow
+from app.pagination import get_page, get_page_statement
+from app.qrcodes.cache import qr_code_cache
+from app.qrcodes.encoders import QR_CODE_ENCODERS
+from app.qrcodes.models import QRCodeOptions
+from app.qrcodes.pool import qr_code_render_pool
 
 
 class EmployeeServiceBase:
@@ -25,27 +68,40 @@ class EmployeeServiceBase:
     It is intended to be used by other service classes.
 
     Attributes:
-        session: The database session to be used for operations.
+        session: The asynchronous database session to be used for operations.
     """
 
-    def __init__(self, session: Session):
+    def __init__(self, session: AsyncSession):
         self.session = session
 
-    def get_employee_by_attribute(
+    async def get_employee_by_attribute(
         self, attribute: EmployeeAttribute, value: str
     ) -> Employee:
         """
         Retrieve an employee's identity information from the database using an attribute.
+
+        Lookups by internal ID or email are served by the employee cache when possible,
+        the employee is then a detached copy.
         Args:
             attribute: The attribute to be used for retrieval.
             value: The value of the attribute.
         Returns:
             The employee's identity information.
         """
+        cached = attribute != EmployeeAttribute.ID
+        if cached:
+            employee = employee_cache.get(attribute, value)
+            if employee is not None:
+                return employee
+        version = employee_cache.version
         try:
-            employee = self.session.exec(
-                select(Employee).where(getattr(Employee, attribute.value) == value)
+            employee = (
+                await self.session.exec(
+                    select(Employee).where(getattr(Employee, attribute.value) == value)
+                )
             ).one()
+            if cached:
+                employee_cache.put(employee, version)
             return employee
         except NoResultFound:
             raise HTTPException(
@@ -58,7 +114,26 @@ class EmployeeServiceBase:
                 detail=f"Multiple employees found with {attribute.value} = {value}",
             )
 
-    def update_employee_by_attribute(
+    async def get_employee_by_identifier(
+        self, identifier: EmployeeIdentifier
+    ) -> Employee:
+        """
+        Retrieve an employee's identity information from the database using the identifier
+        they entered.
+        Args:
+            identifier: The employee's internal ID or email.
+        Returns:
+            The employee's identity information.
+        """
+        if identifier.internal_id:
+            return await self.get_employee_by_attribute(
+                EmployeeAttribute.INTERNAL_ID, identifier.internal_id
+            )
+        return await self.get_employee_by_attribute(
+            EmployeeAttribute.EMAIL, str(identifier.email)
+        )
+
+    async def update_employee_by_attribute(
         self, attribute: EmployeeAttribute, value: str, employee: EmployeeCreate
     ) -> Employee:
         """
@@ -71,17 +146,23 @@ class EmployeeServiceBase:
             The updated employee.
         """
         try:
-            db_employee = self.session.exec(
-                select(Employee).where(getattr(Employee, attribute.value) == value)
+            db_employee = (
+                await self.session.exec(
+                    select(Employee).where(getattr(Employee, attribute.value) == value)
+                )
             ).one()
+            # Cached QR codes are keyed by the code, which may be about to change
+            qr_code_cache.invalidate(db_employee.code_to_print)
+            previous_keys = (db_employee.internal_id, str(db_employee.email))
             db_employee.internal_id = employee.internal_id
             db_employee.email = employee.email
             db_employee.code_to_print = employee.code_to_print
             db_employee.surname = employee.surname
             db_employee.firstname = employee.firstname
             self.session.add(db_employee)
-            self.session.commit()
-            self.session.refresh(db_employee)
+            await self.session.commit()
+            employee_cache.invalidate(*previous_keys)
+            await self.session.refresh(db_employee)
             return db_employee
         except NoResultFound:
             raise HTTPException(
@@ -94,7 +175,7 @@ class EmployeeServiceBase:
                 detail=f"Multiple employees found with {attribute.value} = {value}",
             )
 
-    def delete_employee_by_attribute(
+    async def delete_employee_by_attribute(
         self, attribute: EmployeeAttribute, value: str
     ) -> Employee:
         """
@@ -106,11 +187,16 @@ class EmployeeServiceBase:
             The removed employee.
         """
         try:
-            employee = self.session.exec(
-                select(Employee).where(getattr(Employee, attribute.value) == value)
+            employee = (
+                await self.session.exec(
+                    select(Employee).where(getattr(Employee, attribute.value) == value)
+                )
             ).one()
-            self.session.delete(employee)
-            self.session.commit()
+            await self.session.delete(employee)
+            await self.session.commit()
+            row_counts.invalidate(Employee)
+            employee_cache.invalidate(employee.internal_id, str(employee.email))
+            qr_code_cache.invalidate(employee.code_to_print)
             return employee
         except NoResultFound:
             raise HTTPException(
@@ -123,38 +209,36 @@ class EmployeeServiceBase:
                 detail=f"Multiple employees found with {attribute.value} = {value}",
             )
 
-    def create_employee_state(self, employee: Employee) -> EmployeeState:
+    async def create_employee_state(self, employee: Employee) -> EmployeeState:
         """
         Create a new employee state in the database.
 
+        The state is inserted straight away, the unique internal ID rejects a state
+        created meanwhile by a concurrent request.
         Args:
             employee: The employee for whom the state is to be created.
         Returns:
             The created employee state.
         """
-        try:
-            self.session.exec(
-                select(EmployeeState).where(
-                    EmployeeState.internal_id == employee.internal_id
-                )
-            ).one()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="State for employee already exists",
-            )
-        except NoResultFound:
-            pass
         new_state = EmployeeState(
+            id=uuid4(),
             internal_id=employee.internal_id,
             code_to_print=employee.code_to_print,
         )
         db_state = EmployeeState.model_validate(new_state)
         self.session.add(db_state)
-        self.session.commit()
-        self.session.refresh(db_state)
+        try:
+            await self.session.commit()
+        except IntegrityError:
+            await self.session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="State for employee already exists",
+            )
+        row_counts.invalidate(EmployeeState)
         return db_state
 
-    def get_employee_state(self, employee: Employee) -> EmployeeState:
+    async def get_employee_state(self, employee: Employee) -> EmployeeState:
         """
         Retrieve an employee's state information from the database.
 
@@ -164,9 +248,11 @@ class EmployeeServiceBase:
             The employee's state information.
         """
         try:
-            state = self.session.exec(
-                select(EmployeeState).where(
-                    EmployeeState.internal_id == employee.internal_id
+            state = (
+                await self.session.exec(
+                    select(EmployeeState).where(
+                        EmployeeState.internal_id == employee.internal_id
+                    )
                 )
             ).one()
             return state
@@ -181,7 +267,7 @@ class EmployeeServiceBase:
                 detail="Multiple states found for employee",
             )
 
-    def update_employee_state(
+    async def update_employee_state(
         self, employee: Employee, state: EmployeeState
     ) -> EmployeeState:
         """
@@ -193,16 +279,18 @@ class EmployeeServiceBase:
             The updated state information.
         """
         try:
-            db_state = self.session.exec(
-                select(EmployeeState).where(
-                    EmployeeState.internal_id == employee.internal_id
+            db_state = (
+                await self.session.exec(
+                    select(EmployeeState).where(
+                        EmployeeState.internal_id == employee.internal_id
+                    )
                 )
             ).one()
             db_state.email_code_validated = state.email_code_validated
             db_state.email_code_sent = state.email_code_sent
             self.session.add(db_state)
-            self.session.commit()
-            self.session.refresh(db_state)
+            await self.session.commit()
+            await self.session.refresh(db_state)
             return db_state
         except NoResultFound:
             raise HTTPException(
@@ -215,24 +303,99 @@ class EmployeeServiceBase:
                 detail="Multiple states found for employee",
             )
 
-    def ensure_employee_state(self, employee: Employee) -> EmployeeState:
+    async def ensure_employee_state(self, employee: Employee) -> EmployeeState:
         """
         Ensure that an employee state exists in the database.
 
-        This method checks if an employee state exists in the database, and creates one if it does not.
+        An existing state is only read. A missing state is inserted with ON CONFLICT DO
+        NOTHING, so that concurrent requests for the same employee all get the one state
+        instead of racing to create it.
         Args:
             employee: The employee for whom the state is to be ensured.
         Returns:
             The employee state.
         """
-        try:
-            state = self.get_employee_state(employee)
-        except HTTPException as e:
-            if e.status_code == status.HTTP_404_NOT_FOUND:
-                state = self.create_employee_state(employee)
-            else:
-                raise e
-        return state
+        statement = select(EmployeeState).where(
+            EmployeeState.internal_id == employee.internal_id
+        )
+        state = (await self.session.exec(statement)).first()
+        if state is not None:
+            return state
+        async with write_lock:
+            result = await self.session.exec(
+                dialect_insert(EmployeeState)  # type: ignore
+                .values(
+                    id=uuid4(),
+                    internal_id=employee.internal_id,
+                    code_to_print=employee.code_to_print,
+                    email_code_validated=False,
+                    email_code_sent=False,
+                )
+                .on_conflict_do_nothing(index_elements=[EmployeeState.internal_id])
+            )
+            await self.session.commit()
+        if result.rowcount:
+            row_counts.invalidate(EmployeeState)
+        return (await self.session.exec(statement)).one()
+
+    async def upsert_employee_state(
+        self, employee: Employee
+    ) -> tuple[EmployeeState, bool]:
+        """
+        Create an employee's state for a new code, or reset the existing one, in a single
+        statement (INSERT ... ON CONFLICT DO UPDATE ... RETURNING).
+
+        The new code is on its way: email_code_sent is reset, the outbox workers set it
+        again once the code has been delivered. The statement is not committed, so that
+        it shares the transaction of the caller.
+        Args:
+            employee: The employee whose state is to be upserted.
+        Returns:
+            The employee state, and whether it has been created.
+        """
+        state_id = uuid4()
+        statement = dialect_insert(EmployeeState).values(
+            id=state_id,
+            internal_id=employee.internal_id,
+            code_to_print=employee.code_to_print,
+            email_code_validated=False,
+            email_code_sent=False,
+        )
+        # DO NOTHING would not return the existing row
+        statement = statement.on_conflict_do_update(
+            index_elements=[EmployeeState.internal_id],
+            set_={
+                "code_to_print": statement.excluded.code_to_print,
+                "email_code_sent": False,
+            },
+        ).returning(EmployeeState)
+        state = (
+            await self.session.scalars(
+                statement, execution_options={"populate_existing": True}
+            )
+        ).one()
+        return state, state.id == state_id
+
+    async def enqueue_email(self, employee: Employee, message: Message) -> EmailOutbox:
+        """
+        Queue an email for delivery by the outbox workers.
+
+        Args:
+            employee: The employee to whom the email is to be sent.
+            message: The email message to be sent.
+        Returns:
+            The queued email.
+        """
+        outbox = EmailOutbox(
+            id=uuid4(),
+            internal_id=employee.internal_id,
+            receiver_email=employee.email,
+            message=message.as_string(),
+        )
+        self.session.add(outbox)
+        # Every column is set on the Python side, there is nothing to refresh
+        await self.session.commit()
+        return outbox
 
 
 class EmployeeAdminService(EmployeeServiceBase):
@@ -243,28 +406,20 @@ class EmployeeAdminService(EmployeeServiceBase):
     It is intended to be used by administrators.
     """
 
-    def __init__(self, session: Session):
+    def __init__(self, session: AsyncSession):
         super().__init__(session)
 
-    def create_new_employee(self, employee: EmployeeCreate) -> Employee:
+    async def create_new_employee(self, employee: EmployeeCreate) -> Employee:
         """
         Create a new employee in the database.
+
+        The employee is inserted straight away, the unique columns reject an employee
+        created meanwhile by a concurrent request.
         Args:
             employee: The employee to be created.
         Returns:
             The created employee.
         """
-        try:
-            self.session.exec(
-                select(Employee).where(Employee.internal_id == employee.internal_id)
-            ).one()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Employee with given ID already exists",
-            )
-        except NoResultFound:
-            pass
-
         new_employee: Employee = Employee(
             id=uuid4(),
             internal_id=employee.internal_id,
@@ -276,12 +431,19 @@ class EmployeeAdminService(EmployeeServiceBase):
         db_employee = Employee.model_validate(new_employee)
 
         self.session.add(db_employee)
-        self.session.commit()
-        self.session.refresh(db_employee)
+        try:
+            await self.session.commit()
+        except IntegrityError:
+            await self.session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Employee with given ID, email or code to print already exists",
+            )
+        row_counts.invalidate(Employee)
 
         return db_employee
 
-    def get_employee(self, id: UUID) -> Employee:
+    async def get_employee(self, id: UUID) -> Employee:
         """
         Retrieve an employee's identity information from the database.
 
@@ -291,8 +453,8 @@ class EmployeeAdminService(EmployeeServiceBase):
             The employee's identity information.
         """
         try:
-            employee = self.session.exec(
-                select(Employee).where(Employee.id == id)
+            employee = (
+                await self.session.exec(select(Employee).where(Employee.id == id))
             ).one()
             return employee
         except NoResultFound:
@@ -301,22 +463,35 @@ class EmployeeAdminService(EmployeeServiceBase):
                 detail="Employee does not exist",
             )
 
-    def get_employees(self, offset: int = 0, limit: int = 100):
+    async def get_employees(
+        self, offset: int = 0, limit: int = 100, cursor: str | None = None
+    ) -> tuple[list[Employee], str | None]:
         """
-        Retrieve a list of employees from the database.
+        Retrieve a page of employees from the database, ordered by internal ID.
 
         Args:
-            offset: The number of records to skip.
+            offset: The number of records to skip, ignored with a cursor.
             limit: The maximum number of records to return.
+            cursor: The cursor of the page, as returned with the previous page.
         Returns:
-            A list of employees.
+            A list of employees, and the cursor of the next page if there is one.
         """
-        employees = self.session.exec(
-            select(Employee).offset(offset).limit(limit)
-        ).all()
-        return employees
+        statement = get_page_statement(
+            select(Employee), Employee.internal_id, offset, limit, cursor
+        )
+        employees = (await self.session.exec(statement)).all()
+        return get_page(employees, "internal_id", limit)
 
-    def get_employee_state_by_attribute(
+    async def count_employees(self) -> int:
+        """
+        Count the employees in the database, the count is cached for a few seconds.
+
+        Returns:
+            The number of employees.
+        """
+        return await row_counts.get(self.session, Employee)
+
+    async def get_employee_state_by_attribute(
         self, attribute: EmployeeStateAttribute, value: str
     ) -> EmployeeState:
         """
@@ -329,9 +504,11 @@ class EmployeeAdminService(EmployeeServiceBase):
             The employee's state information.
         """
         try:
-            state = self.session.exec(
-                select(EmployeeState).where(
-                    getattr(EmployeeState, attribute.value) == value
+            state = (
+                await self.session.exec(
+                    select(EmployeeState).where(
+                        getattr(EmployeeState, attribute.value) == value
+                    )
                 )
             ).one()
             return state
@@ -346,7 +523,7 @@ class EmployeeAdminService(EmployeeServiceBase):
                 detail=f"Multiple states found with {attribute.value} = {value}",
             )
 
-    def update_employee_state_by_attribute(
+    async def update_employee_state_by_attribute(
         self, attribute: EmployeeStateAttribute, value: str, state: EmployeeState
     ) -> EmployeeState:
         """
@@ -360,16 +537,18 @@ class EmployeeAdminService(EmployeeServiceBase):
             The updated state information.
         """
         try:
-            db_state = self.session.exec(
-                select(EmployeeState).where(
-                    getattr(EmployeeState, attribute.value) == value
+            db_state = (
+                await self.session.exec(
+                    select(EmployeeState).where(
+                        getattr(EmployeeState, attribute.value) == value
+                    )
                 )
             ).one()
             db_state.email_code_validated = state.email_code_validated
             db_state.email_code_sent = state.email_code_sent
             self.session.add(db_state)
-            self.session.commit()
-            self.session.refresh(db_state)
+            await self.session.commit()
+            await self.session.refresh(db_state)
             return db_state
         except NoResultFound:
             raise HTTPException(
@@ -382,7 +561,7 @@ class EmployeeAdminService(EmployeeServiceBase):
                 detail=f"Multiple states found with {attribute.value} = {value}",
             )
 
-    def delete_employee_state_by_attribute(
+    async def delete_employee_state_by_attribute(
         self, attribute: EmployeeStateAttribute, value: str
     ) -> EmployeeState:
         """
@@ -395,13 +574,16 @@ class EmployeeAdminService(EmployeeServiceBase):
             The removed employee state.
         """
         try:
-            state = self.session.exec(
-                select(EmployeeState).where(
-                    getattr(EmployeeState, attribute.value) == value
+            state = (
+                await self.session.exec(
+                    select(EmployeeState).where(
+                        getattr(EmployeeState, attribute.value) == value
+                    )
                 )
             ).one()
-            self.session.delete(state)
-            self.session.commit()
+            await self.session.delete(state)
+            await self.session.commit()
+            row_counts.invalidate(EmployeeState)
             return state
         except NoResultFound:
             raise HTTPException(
@@ -414,47 +596,300 @@ class EmployeeAdminService(EmployeeServiceBase):
                 detail=f"Multiple states found with {attribute.value} = {value}",
             )
 
-    def get_employee_states(self, offset: int = 0, limit: int = 100):
+    async def get_employee_states(
+        self, offset: int = 0, limit: int = 100, cursor: str | None = None
+    ) -> tuple[list[EmployeeState], str | None]:
         """
-        Retrieve a list of employee states from the database.
+        Retrieve a page of employee states from the database, ordered by internal ID.
         Args:
-            offset: The number of records to skip.
+            offset: The number of records to skip, ignored with a cursor.
             limit: The maximum number of records to return.
+            cursor: The cursor of the page, as returned with the previous page.
         Returns:
-            A list of employee states.
+            A list of employee states, and the cursor of the next page if there is one.
+        """
+
+        statement = get_page_statement(
+            select(EmployeeState), EmployeeState.internal_id, offset, limit, cursor
+        )
+        states = (await self.session.exec(statement)).all()
+        return get_page(states, "internal_id", limit)
+
+    async def count_employee_states(self) -> int:
         """
+        Count the employee states in the database, the count is cached for a few seconds.
 
-        states = self.session.exec(
-            select(EmployeeState).offset(offset).limit(limit)
+        Returns:
+            The number of employee states.
+        """
+        return await row_counts.get(self.session, EmployeeState)
+
+    async def export_rows(
+        self,
+        model: type[Employee] | type[EmployeeState],
+        fields: tuple[str, ...],
+        format: ExportFormat,
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream every row of a table, ordered by internal ID, as NDJSON or CSV.
+
+        Rows are fetched through a server-side cursor EXPORT_BATCH_SIZE at a time and each
+        batch is encoded as soon as it arrives: memory stays constant whatever the size
+        of the table, and the first rows go out before the query is over.
+        Args:
+            model: The table to be exported.
+            fields: The columns to be exported.
+            format: The format of the export.
+        Returns:
+            The encoded rows, one chunk per batch.
+        """
+        statement = (
+            select(*(getattr(model, field) for field in fields))
+            .order_by(model.internal_id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        result = await self.session.stream(statement)
+        if format == ExportFormat.CSV:
+            yield self.encode_rows(fields, [fields], format)
+        async for rows in result.partitions():
+            yield self.encode_rows(fields, rows, format)
+
+    def encode_rows(
+        self, fields: tuple[str, ...], rows: Sequence, format: ExportFormat
+    ) -> bytes:
+        if format == ExportFormat.NDJSON:
+            return "".join(
+                json.dumps(dict(zip(fields, row)), default=str) + "\n" for row in rows
+            ).encode()
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+
+    async def import_employees(
+        self,
+        employees: list[tuple[int, EmployeeCreate]],
+        report: EmployeeImportReport,
+        commit: bool = True,
+    ) -> EmployeeImportReport:
+        """
+        Create many employees at once.
+
+        Rows are processed in batches of IMPORT_BATCH_SIZE: existing identifiers are
+        fetched with one set query per batch and new employees are written with one
+        batched (executemany) INSERT per batch, all inside the session's current transaction.
+        Rows conflicting with existing employees (or with earlier rows of the import)
+        are recorded in the report instead of aborting the import.
+        Args:
+            employees: The employees to be created, along with their line in the source file.
+            report: The report in which created, conflicting and rejected rows are recorded.
+            commit: Whether to commit the transaction once every batch has been inserted,
+                otherwise the caller commits and invalidates the employee count
+                and the employee cache.
+        Returns:
+            The import report.
+        """
+        for start in range(0, len(employees), IMPORT_BATCH_SIZE):
+            batch = employees[start : start + IMPORT_BATCH_SIZE]
+            existing = await self.get_existing_employee_keys(
+                [employee for _, employee in batch]
+            )
+            new_employees = []
+            for line, employee in batch:
+                conflict = self.find_employee_conflict(employee, existing)
+                if conflict is not None:
+                    report.add_row(
+                        EmployeeImportRow(
+                            line=line,
+                            status=EmployeeImportStatus.CONFLICT,
+                            internal_id=employee.internal_id,
+                            detail=f"Employee with {conflict} = "
+                            f"{getattr(employee, conflict)} already exists",
+                        )
+                    )
+                    continue
+                existing["internal_id"].add(employee.internal_id)
+                existing["email"].add(str(employee.email))
+                existing["code_to_print"].add(employee.code_to_print)
+                new_employees.append(
+                    {
+                        "id": uuid4(),
+                        "internal_id": employee.internal_id,
+                        "email": str(employee.email),
+                        "code_to_print": employee.code_to_print,
+                        "surname": employee.surname,
+                        "firstname": employee.firstname,
+                    }
+                )
+            if new_employees:
+                await self.session.exec(insert(Employee), params=new_employees)
+                report.created += len(new_employees)
+        if commit:
+            await self.session.commit()
+            row_counts.invalidate(Employee)
+            employee_cache.clear()
+        return report
+
+    async def get_existing_employee_keys(
+        self, employees: list[EmployeeCreate]
+    ) -> dict[str, set[str]]:
+        """
+        Retrieve the unique identifiers already used by the given employees.
+        Args:
+            employees: The employees whose identifiers are to be looked up.
+        Returns:
+            The identifiers already stored in the database, by attribute name.
+        """
+        internal_ids = [employee.internal_id for employee in employees]
+        emails = [str(employee.email) for employee in employees]
+        codes = [employee.code_to_print for employee in employees]
+        rows = (
+            await self.session.exec(
+                select(
+                    Employee.internal_id, Employee.email, Employee.code_to_print
+                ).where(
+                    or_(
+                        Employee.internal_id.in_(internal_ids),  # type: ignore
+                        Employee.email.in_(emails),  # type: ignore
+                        Employee.code_to_print.in_(codes),  # type: ignore
+                    )
+                )
+            )
         ).all()
-        return states
+        return {
+            "internal_id": {row[0] for row in rows},
+            "email": {row[1] for row in rows},
+            "code_to_print": {row[2] for row in rows},
+        }
+
+    def find_employee_conflict(
+        self, employee: EmployeeCreate, existing: dict[str, set[str]]
+    ) -> str | None:
+        """
+        Find which unique attribute of an employee is already in use.
+        Args:
+            employee: The employee to be checked.
+            existing: The identifiers already in use, by attribute name.
+        Returns:
+            The name of the conflicting attribute, or None if there is no conflict.
+        """
+        for attribute, values in existing.items():
+            if str(getattr(employee, attribute)) in values:
+                return attribute
+        return None
+
+    async def read_csv_records(
+        self, file: UploadFile
+    ) -> AsyncIterator[tuple[int, str]]:
+        """
+        Read the records of a CSV file without loading the whole file in memory.
 
-    ######## danger #######
-    async def parse_csv_file(self, file: UploadFile) -> list[EmployeeCreate]:
+        The file is read and decoded chunk by chunk. Physical lines are grouped into
+        records so that quoted fields spanning several lines are kept together.
+        Args:
+            file: The CSV file to be read.
+        Yields:
+            The line on which each record starts, along with the record's text.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        pending = ""
+        record = ""
+        record_line = 0
+        quotes = 0
+        line_num = 0
+        while True:
+            chunk = await file.read(CSV_READ_CHUNK_SIZE)
+            pending += decoder.decode(chunk, final=not chunk)
+            lines = pending.split("\n")
+            pending = lines.pop()
+            if not chunk and pending:
+                lines.append(pending)
+            for line in lines:
+                line_num += 1
+                if not record:
+                    record_line = line_num
+                record += line + "\n"
+                quotes += line.count('"')
+                # An odd number of quotes means a quoted field continues on the next line
+                if quotes % 2 == 0:
+                    yield record_line, record
+                    record = ""
+                    quotes = 0
+            if not chunk:
+                break
+        if record:
+            yield record_line, record
+
+    async def parse_csv_file(
+        self, file: UploadFile, report: EmployeeImportReport
+    ) -> AsyncIterator[list[tuple[int, EmployeeCreate]]]:
         """
         Parse a CSV file containing employee information.
+
+        The file is streamed and validated rows are yielded in batches of
+        IMPORT_BATCH_SIZE, so memory usage does not depend on the size of the file.
+        Rows that cannot be validated are recorded as rejected in the report.
         Args:
             file: The CSV file to be parsed.
-        Returns:
-            A list of employee information.
+            report: The report in which rejected rows are recorded.
+        Yields:
+            Batches of employee information, along with their line in the file.
+        """
+        header: list[str] | None = None
+        employees: list[tuple[int, EmployeeCreate]] = []
+        try:
+            async for line, record in self.read_csv_records(file):
+                fields = next(csv.reader([record]), [])
+                if not fields:
+                    continue
+                if header is None:
+                    header = fields
+                    self.check_csv_header(header)
+                    continue
+                row = dict(zip(header, fields))
+                try:
+                    employee = EmployeeCreate(
+                        internal_id=row.get("internal_id"),
+                        email=row.get("email"),
+                        code_to_print=row.get("code_to_print"),
+                        surname=row.get("surname"),
+                        firstname=row.get("firstname"),
+                    )
+                except ValidationError as e:
+                    report.add_row(
+                        EmployeeImportRow(
+                            line=line,
+                            status=EmployeeImportStatus.REJECTED,
+                            internal_id=row.get("internal_id"),
+                            detail="; ".join(
+                                f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                                for error in e.errors()
+                            ),
+                        )
+                    )
+                    continue
+                employees.append((line, employee))
+                if len(employees) >= IMPORT_BATCH_SIZE:
+                    yield employees
+                    employees = []
+            if header is None:
+                self.check_csv_header([])
+            if employees:
+                yield employees
+        finally:
+            await file.close()
+
+    def check_csv_header(self, header: list[str]) -> None:
         """
-        employees = []
-        # Read the content as a string stream directly
-        contents = await file.read()
-        # Decode to string if necessary
-        content_string = contents.decode("utf-8")
-        reader = csv.DictReader(content_string.splitlines())
-        for row in reader:
-            employee = EmployeeCreate(
-                internal_id=row["internal_id"],
-                email=row["email"],
-                code_to_print=row["code_to_print"],
-                surname=row["surname"],
-                firstname=row["firstname"],
+        Check that a CSV header contains every employee column.
+        Args:
+            header: The column names of the CSV file.
+        """
+        missing_fields = set(EMPLOYEE_CSV_FIELDS) - set(header)
+        if missing_fields:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"CSV file is missing columns: {sorted(missing_fields)}",
             )
-            employees.append(employee)
-        await file.close()
-        return employees
 
 
 class EmployeeService(EmployeeServiceBase):
@@ -468,7 +903,7 @@ class EmployeeService(EmployeeServiceBase):
         email_service: The email service to be used for sending emails.
     """
 
-    def __init__(self, session: Session, email_service: EmailService):
+    def __init__(self, session: AsyncSession, email_service: EmailService):
         super().__init__(session)
         self.email_service = email_service
 
@@ -486,44 +921,101 @@ class EmployeeService(EmployeeServiceBase):
         )
         return email_code
 
-    def generate_and_send_email(self, employee: Employee) -> EmployeeState:
+    async def generate_and_send_email(self, employee: Employee) -> EmployeeState:
         """
-        Generates an email code for the given employee and sends it to their email address.
+        Generates an email code for the given employee and queues it for delivery to their
+        email address.
+
+        The email is sent by the outbox workers, which set the state's email_code_sent
+        once the SMTP server has accepted it.
         Args:
             employee: The employee to whom the email is to be sent.
         """
         email_code = self.compute_email_code(employee)
         email_message = self.email_service.create_email(employee.email, email_code)
-        state = self.ensure_employee_state(employee)
-
-        try:
-            self.email_service.send_email(email_message, employee.email)
-            state.email_code_sent = True
-        except Exception as e:
-            # Very crude, needs to be more thorough
-            print(e)
-            state.email_code_sent = False
-
-        self.update_employee_state(employee, state)
+        # Cached employees have not been looked up: take a connection before the lock, as
+        # the requests waiting for the lock may hold every pooled connection
+        await self.session.connection()
+        async with write_lock:
+            state, created = await self.upsert_employee_state(employee)
+            # Commits the state along with the email
+            await self.enqueue_email(employee, email_message)
+        if created:
+            row_counts.invalidate(EmployeeState)
         return state
 
-    def create_qr_code(self, employee: Employee) -> str:
+    async def create_qr_code(
+        self, employee: Employee, options: QRCodeOptions = QRCodeOptions()
+    ) -> str:
         """
-        Creates a QR code for the given employee.
+        Creates a QR code for the given employee and writes it to disk.
+
+        Rendered QR codes are cached, a cached QR code is written to disk without being
+        rendered again.
         Args:
             employee: The employee for whom the QR code is to be created.
+            options: The rendering options.
         Returns:
             The path to the created QR code.
         """
-        state = self.ensure_employee_state(employee)
+        await self.check_email_code_validated(employee)
+        extension = QR_CODE_ENCODERS[options.format].extension
+        if options == QRCodeOptions(format=options.format):
+            qr_code_path = f"app/static/qr_codes/{employee.internal_id}.{extension}"
+        else:
+            qr_code_path = (
+                f"app/static/qr_codes/{employee.internal_id}"
+                f"_{options.box_size}_{options.border}.{extension}"
+            )
+        image = qr_code_cache.get(employee.code_to_print, options)
+        if image is None:
+            image = await self.render_qr_code(employee, options)
+        # The file is named after the employee, not their code: it is rewritten every time
+        # so that it never holds the QR code of a former code
+        Path(qr_code_path).write_bytes(image)
+        return qr_code_path
+
+    async def get_qr_code(
+        self, employee: Employee, options: QRCodeOptions = QRCodeOptions()
+    ) -> bytes:
+        """
+        Retrieves the QR code of the given employee, rendering it if it is not cached.
+        Args:
+            employee: The employee whose QR code is to be retrieved.
+            options: The rendering options, including the output format.
+        Returns:
+            The encoded QR code.
+        """
+        await self.check_email_code_validated(employee)
+        image = qr_code_cache.get(employee.code_to_print, options)
+        if image is None:
+            image = await self.render_qr_code(employee, options)
+        return image
+
+    async def render_qr_code(self, employee: Employee, options: QRCodeOptions) -> bytes:
+        """
+        Renders the QR code of the given employee in the QR code render pool and caches it.
+        Args:
+            employee: The employee whose QR code is to be rendered.
+            options: The rendering options.
+        Returns:
+            The encoded QR code.
+        """
+        image = await qr_code_render_pool.render(employee.code_to_print, options)
+        qr_code_cache.put(employee.code_to_print, options, image)
+        return image
+
+    async def check_email_code_validated(self, employee: Employee) -> None:
+        """
+        Checks that the employee has validated their email code.
+        Args:
+            employee: The employee to be checked.
+        """
+        state = await self.ensure_employee_state(employee)
         if not state.email_code_validated:
             raise ValueError("Email code not validated for employee.")
-        img = qrcode.make(employee.code_to_print)
-        qr_code_path = f"app/static/qr_codes/{employee.internal_id}.png"
-        img.save(qr_code_path)
-        return qr_code_path
 
-    def validate_email_code(self, employee: Employee, input_code: str) -> bool:
+    async def validate_email_code(self, employee: Employee, input_code: str) -> bool:
         """
         Validates the email code entered by the employee.
         Args:
@@ -533,9 +1025,370 @@ class EmployeeService(EmployeeServiceBase):
             True if the email code is valid, False otherwise.
         """
         expected_code = self.compute_email_code(employee)
-        state = self.ensure_employee_state(employee)
+        state = await self.ensure_employee_state(employee)
         if input_code == expected_code:
             state.email_code_validated = True
-            self.update_employee_state(employee, state)
+            await self.update_employee_state(employee, state)
             return True
         return False
+
+
+class EmailOutboxService:
+    """
+    Service class for the email outbox.
+
+    This class provides methods to claim queued emails and record their delivery.
+    It is intended to be used by the outbox workers, which run in threads and therefore
+    use a synchronous session.
+
+    Attributes:
+        session: The database session to be used for operations.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def claim_emails(self, limit: int) -> list[EmailOutbox]:
+        """
+        Claim due emails for delivery.
+
+        Claimed emails are leased for EMAIL_OUTBOX_LEASE_SECONDS, during which no other
+        worker can claim them.
+        Args:
+            limit: The maximum number of emails to claim.
+        Returns:
+            The claimed emails.
+        """
+        now = utcnow()
+        is_due = (
+            (EmailOutbox.status == EmailOutboxStatus.PENDING)
+            & (EmailOutbox.next_attempt_at <= now)
+            & (
+                EmailOutbox.locked_until.is_(None)  # type: ignore
+                | (EmailOutbox.locked_until < now)  # type: ignore
+            )
+        )
+        ids = self.session.exec(
+            select(EmailOutbox.id)
+            .where(is_due)
+            .order_by(EmailOutbox.next_attempt_at)  # type: ignore
+            .limit(limit)
+        ).all()
+        if not ids:
+            return []
+        lock = uuid4()
+        # The due condition is checked again so that concurrent workers never claim the
+        # same email twice.
+        self.session.exec(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(ids), is_due)  # type: ignore
+            .values(
+                locked_by=lock,
+                locked_until=now + timedelta(seconds=EMAIL_OUTBOX_LEASE_SECONDS),
+            )
+        )
+        self.session.commit()
+        emails = self.session.exec(
+            select(EmailOutbox).where(EmailOutbox.locked_by == lock)
+        ).all()
+        return list(emails)
+
+    def renew_lease(self, emails: list[EmailOutbox]) -> None:
+        """
+        Extend the lease of claimed emails by EMAIL_OUTBOX_LEASE_SECONDS.
+
+        Emails claimed meanwhile by another worker, their lease having expired, are left
+        to it.
+        Args:
+            emails: The claimed emails.
+        """
+        if not emails:
+            return
+        self.session.exec(
+            update(EmailOutbox)
+            .where(
+                EmailOutbox.id.in_([email.id for email in emails]),  # type: ignore
+                EmailOutbox.locked_by == emails[0].locked_by,
+            )
+            .values(
+                locked_until=utcnow() + timedelta(seconds=EMAIL_OUTBOX_LEASE_SECONDS)
+            )
+        )
+        self.session.commit()
+
+    def mark_emails_sent(self, emails: list[EmailOutbox]) -> None:
+        """
+        Record the delivery of emails and flag the codes as sent in the employees' states.
+
+        Args:
+            emails: The delivered emails.
+        """
+        if not emails:
+            return
+        now = utcnow()
+        self.session.exec(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_([email.id for email in emails]))  # type: ignore
+            .values(
+                status=EmailOutboxStatus.SENT,
+                attempts=EmailOutbox.attempts + 1,
+                sent_at=now,
+                locked_by=None,
+                locked_until=None,
+            )
+        )
+        self.session.exec(
+            update(EmployeeState)
+            .where(
+                EmployeeState.internal_id.in_(  # type: ignore
+                    [email.internal_id for email in emails]
+                )
+            )
+            .values(email_code_sent=True)
+        )
+        self.session.commit()
+
+    def mark_email_failed(self, outbox: EmailOutbox, error: str) -> EmailOutbox:
+        """
+        Record a failed delivery attempt.
+
+        The email is retried with exponential backoff, and given up on after
+        EMAIL_OUTBOX_MAX_ATTEMPTS attempts.
+        Args:
+            outbox: The email which could not be delivered.
+            error: The reason of the failure.
+        Returns:
+            The updated email.
+        """
+        outbox.attempts += 1
+        outbox.last_error = error
+        outbox.locked_by = None
+        outbox.locked_until = None
+        if outbox.attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+            outbox.status = EmailOutboxStatus.FAILED
+        else:
+            backoff = min(
+                EMAIL_OUTBOX_BACKOFF_SECONDS * 2 ** (outbox.attempts - 1),
+                EMAIL_OUTBOX_MAX_BACKOFF_SECONDS,
+            )
+            outbox.next_attempt_at = utcnow() + timedelta(
+                seconds=backoff * random.uniform(0.8, 1.2)
+            )
+        self.session.add(outbox)
+        self.session.commit()
+        self.session.refresh(outbox)
+        return outbox
+
+
+class EmailCampaignService(EmployeeService):
+    """
+    Service class for email campaigns.
+
+    This class provides methods to send verification codes to many employees at once.
+    It is intended to be used by administrators.
+    """
+
+    def __init__(self, session: AsyncSession, email_service: EmailService):
+        super().__init__(session, email_service)
+
+    async def create_campaign(self, campaign: EmailCampaignCreate) -> EmailCampaign:
+        """
+        Queue verification codes for a set of employees.
+
+        Employees are processed in batches of EMAIL_CAMPAIGN_BATCH_SIZE: missing states
+        and queued emails are created with one INSERT per batch, and each batch is
+        committed on its own. Large campaigns thus neither hold the database's write lock
+        for long nor build up one large transaction, and the outbox workers can deliver
+        the first batches meanwhile. Should a batch fail, the batches before it stay
+        queued and are counted in the campaign's total.
+        Args:
+            campaign: The employees targeted by the campaign.
+        Returns:
+            The created campaign.
+        """
+        if campaign.target == EmailCampaignTarget.IDS and not campaign.internal_ids:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="internal_ids must be provided for an ids campaign",
+            )
+        db_campaign = EmailCampaign(id=uuid4(), target=campaign.target)
+        self.session.add(db_campaign)
+        # Holding the lock while waiting for a connection held by requests waiting for
+        # the lock would deadlock
+        await self.session.connection()
+        async with write_lock:
+            await self.session.commit()
+
+        async for employees in self.get_campaign_employees(campaign):
+            # Rendering emails is CPU-bound, keep the event loop free meanwhile
+            messages = await asyncio.to_thread(self.create_campaign_emails, employees)
+            async with write_lock:
+                await self.create_missing_employee_states(employees)
+                await self.session.exec(
+                    insert(EmailOutbox),
+                    params=[
+                        {
+                            "id": uuid4(),
+                            "internal_id": employee.internal_id,
+                            "campaign_id": db_campaign.id,
+                            "receiver_email": employee.email,
+                            "message": message,
+                        }
+                        for employee, message in zip(employees, messages)
+                    ],
+                )
+                db_campaign.total += len(employees)
+                self.session.add(db_campaign)
+                await self.session.commit()
+            row_counts.invalidate(EmployeeState)
+
+        await self.session.refresh(db_campaign)
+        return db_campaign
+
+    def create_campaign_emails(self, employees: list[Employee]) -> list[str]:
+        """
+        Render the verification emails of a batch of employees.
+
+        Args:
+            employees: The employees to whom the emails are to be sent.
+        Returns:
+            The serialized emails, in the order of the employees.
+        """
+        return [
+            self.email_service.create_email(
+                employee.email, self.compute_email_code(employee)
+            ).as_string()
+            for employee in employees
+        ]
+
+    async def get_campaign_employees(
+        self, campaign: EmailCampaignCreate
+    ) -> AsyncIterator[list[Employee]]:
+        """
+        Retrieve the employees targeted by a campaign.
+
+        Employees are paged by internal ID, so that they are never all loaded at once.
+        Unsent campaigns skip employees whose code was already sent or is already queued.
+        Args:
+            campaign: The employees targeted by the campaign.
+        Yields:
+            Batches of employees.
+        """
+        statement = select(Employee)
+        if campaign.target == EmailCampaignTarget.UNSENT:
+            queued = (
+                select(EmailOutbox.id)
+                .where(EmailOutbox.internal_id == Employee.internal_id)
+                .where(EmailOutbox.status == EmailOutboxStatus.PENDING)
+            )
+            statement = (
+                statement.outerjoin(
+                    EmployeeState,
+                    EmployeeState.internal_id == Employee.internal_id,  # type: ignore
+                )
+                .where(
+                    or_(
+                        EmployeeState.id.is_(None),  # type: ignore
+                        EmployeeState.email_code_sent == False,  # noqa: E712
+                    )
+                )
+                .where(~queued.exists())
+            )
+        elif campaign.target == EmailCampaignTarget.IDS:
+            statement = statement.where(
+                Employee.internal_id.in_(set(campaign.internal_ids or []))  # type: ignore
+            )
+
+        last_internal_id = ""
+        while True:
+            employees = (
+                await self.session.exec(
+                    statement.where(Employee.internal_id > last_internal_id)
+                    .order_by(Employee.internal_id)  # type: ignore
+                    .limit(EMAIL_CAMPAIGN_BATCH_SIZE)
+                )
+            ).all()
+            if not employees:
+                return
+            yield list(employees)
+            last_internal_id = employees[-1].internal_id
+
+    async def create_missing_employee_states(self, employees: list[Employee]) -> None:
+        """
+        Create the states of the given employees which do not have one yet.
+
+        States created meanwhile by a concurrent request are left as is (ON CONFLICT DO
+        NOTHING).
+        Args:
+            employees: The employees whose states are to be created.
+        """
+        await self.session.exec(
+            dialect_insert(EmployeeState).on_conflict_do_nothing(  # type: ignore
+                index_elements=[EmployeeState.internal_id]
+            ),
+            params=[
+                {
+                    "id": uuid4(),
+                    "internal_id": employee.internal_id,
+                    "code_to_print": employee.code_to_print,
+                    "email_code_validated": False,
+                    "email_code_sent": False,
+                }
+                for employee in employees
+            ],
+        )
+
+    async def get_campaign(self, id: UUID) -> EmailCampaignRead:
+        """
+        Retrieve the progress of a campaign.
+
+        Args:
+            id: The database ID of the campaign.
+        Returns:
+            The campaign, along with the number of emails in each delivery status and the
+            delivery throughput so far.
+        """
+        try:
+            campaign = (
+                await self.session.exec(
+                    select(EmailCampaign).where(EmailCampaign.id == id)
+                )
+            ).one()
+        except NoResultFound:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Campaign does not exist",
+            )
+        counts = {
+            row[0]: row[1]
+            for row in (
+                await self.session.exec(
+                    select(EmailOutbox.status, func.count())
+                    .where(EmailOutbox.campaign_id == id)
+                    .group_by(EmailOutbox.status)
+                )
+            ).all()
+        }
+        last_sent_at = (
+            await self.session.exec(
+                select(func.max(EmailOutbox.sent_at)).where(
+                    EmailOutbox.campaign_id == id
+                )
+            )
+        ).one()
+        sent = counts.get(EmailOutboxStatus.SENT, 0)
+        emails_per_second = None
+        if last_sent_at is not None and last_sent_at > campaign.created_at:
+            elapsed = (last_sent_at - campaign.created_at).total_seconds()
+            emails_per_second = round(sent / elapsed, 2)
+        return EmailCampaignRead(
+            id=campaign.id,
+            target=campaign.target,
+            total=campaign.total,
+            pending=counts.get(EmailOutboxStatus.PENDING, 0),
+            sent=sent,
+            failed=counts.get(EmailOutboxStatus.FAILED, 0),
+            created_at=campaign.created_at,
+            last_sent_at=last_sent_at,
+            emails_per_second=emails_per_second,
+        )
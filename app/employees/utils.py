@@ -1,40 +1,48 @@
 from uuid import uuid4
-from sqlalchemy.exc import IntegrityError
-from sqlmodel import Session
-from app.database import engine
-from app.employees.models import Employee, EmployeeState
 
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.employees.models import Employee, EmployeeState
 
-def add_fake_employee():
-    employee = Employee(
-        id=uuid4(),
-        internal_id="12345",
-        code_to_print="ABCDE",
-        surname="Doe",
-        firstname="John",
-        email="john.doe@email.com",
-    )
-    db_employee = Employee.model_validate(employee)
-    session = Session(engine)
-    session.add(db_employee)
-    try:
-        session.commit()
-    except IntegrityError:
-        pass
 
+async def create_seed_employees(session: AsyncSession) -> None:
+    """
+    Add the fake employee and its state to the session if they do not exist yet, without
+    committing.
 
-def add_fake_employee_state():
-    employee_state = EmployeeState(
-        id=uuid4(),
-        internal_id="12345",
-        code_to_print="ABCDE",
-        email_code_validated=False,
-        email_code_sent=False,
-    )
-    db_employee_state = EmployeeState.model_validate(employee_state)
-    session = Session(engine)
-    session.add(db_employee_state)
-    try:
-        session.commit()
-    except IntegrityError:
-        pass
+    Args:
+        session: The database session to add the employee to.
+    """
+    internal_id = "12345"
+    employee_exists, state_exists = (
+        await session.exec(
+            select(
+                select(Employee.id).where(Employee.internal_id == internal_id).exists(),
+                select(EmployeeState.id)
+                .where(EmployeeState.internal_id == internal_id)
+                .exists(),
+            )
+        )
+    ).one()
+    if not employee_exists:
+        session.add(
+            Employee(
+                id=uuid4(),
+                internal_id=internal_id,
+                code_to_print="ABCDE",
+                surname="Doe",
+                firstname="John",
+                email="john.doe@email.com",
+            )
+        )
+    if not state_exists:
+        session.add(
+            EmployeeState(
+                id=uuid4(),
+                internal_id=internal_id,
+                code_to_print="ABCDE",
+                email_code_validated=False,
+                email_code_sent=False,
+            )
+        )
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+
+from sqlmodel import Session
+
+from app.database import engine
+from app.emails.dependencies import get_email_service
+from app.emails.services import EmailService
+from app.employees.config import (
+    EMAIL_OUTBOX_BATCH_SIZE,
+    EMAIL_OUTBOX_LEASE_SECONDS,
+    EMAIL_OUTBOX_POLL_INTERVAL,
+    EMAIL_OUTBOX_WORKERS,
+)
+from app.employees.services import EmailOutboxService
+
+logger = logging.getLogger(__name__)
+
+
+class EmailOutboxWorkers:
+    """
+    Pool of background workers delivering the emails queued in the outbox.
+
+    Each worker repeatedly claims a batch of due emails and sends them over one pooled SMTP
+    connection, so the number of workers bounds the number of connections. SMTP and database
+    calls are blocking, so batches are processed in a thread to keep the event loop free.
+    Workers sleep for EMAIL_OUTBOX_POLL_INTERVAL seconds when the outbox is empty, unless
+    woken up by notify().
+
+    Attributes:
+        email_service: The email service used to send the emails.
+        size: The number of workers.
+    """
+
+    def __init__(self, email_service: EmailService, size: int = EMAIL_OUTBOX_WORKERS):
+        self.email_service = email_service
+        self.size = size
+        self.wakeup = asyncio.Event()
+        self.tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        """
+        Start the workers.
+        """
+        self.tasks = [asyncio.create_task(self.run()) for _ in range(self.size)]
+
+    async def stop(self) -> None:
+        """
+        Stop the workers. Emails being sent are picked up again once their lease expires.
+        """
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def notify(self) -> None:
+        """
+        Wake up idle workers, typically after an email has been queued.
+        """
+        self.wakeup.set()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                claimed = await asyncio.to_thread(self.deliver_batch)
+            except Exception:
+                logger.exception("Failed to deliver a batch of queued emails")
+                claimed = 0
+            if claimed:
+                continue
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), EMAIL_OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def deliver_batch(self) -> int:
+        """
+        Claim a batch of due emails and send them.
+
+        The lease of the emails still to be sent is renewed once half of it has elapsed,
+        so that a slow SMTP server does not let it expire mid-batch and another worker
+        send the same emails again.
+        Returns:
+            The number of claimed emails.
+        """
+        # The claimed emails are still read once the lease renewals are committed
+        with Session(engine, expire_on_commit=False) as session:
+            service = EmailOutboxService(session)
+            emails = service.claim_emails(EMAIL_OUTBOX_BATCH_SIZE)
+            if not emails:
+                return 0
+            renew_at = time.monotonic() + EMAIL_OUTBOX_LEASE_SECONDS / 2
+
+            def renew_lease(sent: int) -> None:
+                nonlocal renew_at
+                if time.monotonic() >= renew_at:
+                    service.renew_lease(emails[sent:])
+                    renew_at = time.monotonic() + EMAIL_OUTBOX_LEASE_SECONDS / 2
+
+            # The whole batch goes through a single pooled SMTP connection
+            errors = self.email_service.send_emails(
+                [(email.message, email.receiver_email) for email in emails],
+                before_send=renew_lease,
+            )
+            service.mark_emails_sent(
+                [email for email, error in zip(emails, errors) if error is None]
+            )
+            for email, error in zip(emails, errors):
+                if error is not None:
+                    service.mark_email_failed(email, str(error))
+            return len(emails)
+
+
+email_outbox_workers = EmailOutboxWorkers(get_email_service())
@@ -0,0 +1,6 @@
+from fastapi import HTTPException, status
+
+invalid_cursor = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid cursor",
+)
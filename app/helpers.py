@@ -1,5 +1,11 @@
+from datetime import datetime, timezone
 from pathlib import Path
 
 
 def getProjectRoot() -> Path:
     return Path(__file__).parent
+
+
+def utcnow() -> datetime:
+    """Current UTC time as a naive datetime, as stored by the database."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
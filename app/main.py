@@ -1,5 +1,7 @@
 import os
 import json
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 
 import uvicorn
@@ -10,24 +12,59 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.auth import router as auth_routes
+from app.auth.calibration import get_password_hash_rounds
+from app.auth.pool import password_hashing_pool
+from app.auth.services import configure_password_hashing
+from app.auth.versions import roles_versions
 from app.employees import router as employee_routes
-from app.employees.utils import add_fake_employee, add_fake_employee_state
+from app.employees.workers import email_outbox_workers
+from app.qrcodes import router as qr_code_routes
+from app.qrcodes.pool import qr_code_render_pool
+from app.qrcodes.warmup import qr_code_warmup
+from app.emails.dependencies import get_email_service
 from app.users import router as user_routes
-from app.users.utils import create_superuser, create_fake_users
-from app.database import create_db_and_tables
+from app.config import SEED_DATABASE
+from app.database import async_engine, create_db_and_tables
+from app.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from app.seeding import seed_database
 
 
 ORIGINS: list = json.loads(os.getenv("ORIGINS"))  # type: ignore
 
+logger = logging.getLogger(__name__)
+
+
+async def seed() -> None:
+    try:
+        if await seed_database():
+            roles_versions.load()
+            qr_code_warmup.trigger()
+    except Exception:
+        logger.exception("Failed to seed the database")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
-    add_fake_employee()
-    add_fake_employee_state()
-    create_superuser()
-    create_fake_users()
+    configure_password_hashing(await asyncio.to_thread(get_password_hash_rounds))
+    roles_versions.start()
+    email_outbox_workers.start()
+    qr_code_render_pool.start()
+    qr_code_warmup.trigger()
+    # Seeding hashes passwords, let the server accept traffic meanwhile
+    seeding = asyncio.create_task(seed()) if SEED_DATABASE else None
     yield
+    if seeding is not None:
+        seeding.cancel()
+        await asyncio.gather(seeding, return_exceptions=True)
+    await qr_code_warmup.stop()
+    await roles_versions.stop()
+    password_hashing_pool.shutdown()
+    await email_outbox_workers.stop()
+    get_email_service().close()
+    qr_code_render_pool.shutdown()
+    # Pooled aiosqlite connections run in threads which would keep the process alive
+    await async_engine.dispose()
 
 
 api = FastAPI(lifespan=lifespan)
@@ -38,10 +75,12 @@ api.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER],
 )
 api.include_router(auth_routes.router)
 api.include_router(employee_routes.router)
 api.include_router(user_routes.router)
+api.include_router(qr_code_routes.router)
 
 
 def start_server():
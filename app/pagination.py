@@ -0,0 +1,74 @@
+import base64
+import binascii
+from typing import Any, Sequence, TypeVar
+
+from sqlmodel.sql.expression import SelectOfScalar
+
+from app.exceptions import invalid_cursor
+
+T = TypeVar("T")
+
+# Response header carrying the cursor of the next page, absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Response header carrying the total number of rows, when requested with include_total
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def encode_cursor(key: str) -> str:
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return base64.b64decode(padded, altchars=b"-_", validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise invalid_cursor
+
+
+def get_page_statement(
+    statement: SelectOfScalar[T],
+    key: Any,
+    offset: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+) -> SelectOfScalar[T]:
+    """
+    Restrict a statement to a page of rows ordered by a unique key.
+
+    With a cursor, the page starts right after the last row of the previous page, which
+    the database finds through the key's index however deep the page is. Otherwise the
+    page starts after offset rows. One more row than the page holds is selected, to
+    know whether there is a next page.
+    Args:
+        statement: The statement selecting the rows.
+        key: The unique and indexed column the rows are ordered by.
+        offset: The number of rows to skip, ignored with a cursor.
+        limit: The maximum number of rows of the page.
+        cursor: The cursor of the page, as returned with the previous page.
+    Returns:
+        The statement selecting the page.
+    """
+    statement = statement.order_by(key)
+    if cursor is not None:
+        statement = statement.where(key > decode_cursor(cursor))
+    elif offset:
+        statement = statement.offset(offset)
+    return statement.limit(limit + 1)
+
+
+def get_page(rows: Sequence[T], key: str, limit: int) -> tuple[list[T], str | None]:
+    """
+    Split the rows selected by a page statement into the page and the next cursor.
+
+    Args:
+        rows: The rows selected by the statement of get_page_statement.
+        key: The name of the attribute the rows are ordered by.
+        limit: The maximum number of rows of the page.
+    Returns:
+        The rows of the page, and the cursor of the next page if there is one.
+    """
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    return page, encode_cursor(getattr(page[-1], key))
@@ -0,0 +1,106 @@
+import argparse
+import io
+import timeit
+from typing import Callable
+
+import qrcode
+
+from app.qrcodes.encoders import QR_CODE_ENCODERS, encode_png, rasterize
+from app.qrcodes.models import QRCodeOptions
+from app.qrcodes.schemas import QRCodeFormat
+from app.qrcodes.services import get_qr_code_matrix, render_qr_code_pil
+
+BENCHMARK_CODE = "EMP-000123-XYZ"
+
+
+def measure_time(function: Callable[[], object], samples: int) -> float:
+    """
+    Measure how long a function takes.
+
+    Args:
+        function: The function, called without arguments.
+        samples: The number of calls to average.
+    Returns:
+        The average time of a call, in milliseconds.
+    """
+    function()
+    return timeit.timeit(function, number=samples) / samples * 1000
+
+
+def benchmark_render(samples: int) -> None:
+    """
+    Compare qrcode's PIL backend with the NumPy backend on a PNG QR code: rasterizing
+    and encoding a precomputed module matrix, then the whole render.
+
+    Args:
+        samples: The number of calls to average.
+    """
+    options = QRCodeOptions()
+    qr = qrcode.QRCode(box_size=options.box_size, border=options.border)
+    qr.add_data(BENCHMARK_CODE)
+    qr.make(fit=True)
+    matrix = get_qr_code_matrix(BENCHMARK_CODE, options)
+
+    def encode_pil() -> bytes:
+        buffer = io.BytesIO()
+        qr.make_image().save(buffer)
+        return buffer.getvalue()
+
+    def encode_numpy() -> bytes:
+        return encode_png(rasterize(matrix, options.box_size))
+
+    def render_pil() -> bytes:
+        return render_qr_code_pil(BENCHMARK_CODE, options)
+
+    def render_numpy() -> bytes:
+        matrix = get_qr_code_matrix(BENCHMARK_CODE, options)
+        return encode_png(rasterize(matrix, options.box_size))
+
+    print("backend  rasterize + encode (ms)  render (ms)  size (B)")
+    for backend, encode, render in (
+        ("pil", encode_pil, render_pil),
+        ("numpy", encode_numpy, render_numpy),
+    ):
+        print(
+            f"{backend:<7}  {measure_time(encode, samples):>23.2f}"
+            f"  {measure_time(render, samples):>11.2f}  {len(render()):>8}"
+        )
+
+
+def benchmark_encode(samples: int) -> None:
+    """
+    Measure the encode time and the size of every output format, from a precomputed
+    module matrix.
+
+    Args:
+        samples: The number of calls to average.
+    """
+    matrix = get_qr_code_matrix(BENCHMARK_CODE, QRCodeOptions())
+    print(f"{matrix.shape[0]}x{matrix.shape[1]} modules, border included")
+    print("format  encode (us)  size (B)")
+    for qr_code_format in QRCodeFormat:
+        options = QRCodeOptions(format=qr_code_format)
+        encoder = QR_CODE_ENCODERS[qr_code_format]
+
+        def encode() -> bytes:
+            return encoder.encode(matrix, options)
+
+        elapsed = measure_time(encode, samples) * 1000
+        print(f"{qr_code_format.value:<6}  {elapsed:>11.0f}  {len(encode()):>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the QR code rendering.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser(
+        "render", help="Compare qrcode's PIL backend with the NumPy backend."
+    )
+    commands.add_parser(
+        "encode", help="Measure the encode time and size of every output format."
+    )
+    parser.add_argument("--samples", type=int, default=500)
+    args = parser.parse_args()
+    if args.command == "render":
+        benchmark_render(args.samples)
+    elif args.command == "encode":
+        benchmark_encode(args.samples)
@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+
+from app.qrcodes.config import QR_CACHE_MAX_BYTES
+from app.qrcodes.models import QRCodeCacheStats, QRCodeOptions
+
+
+class QRCodeCache:
+    """
+    Least recently used cache of encoded QR code images.
+
+    Images are keyed by the printed code and the options they were rendered with. The
+    cache is bounded by the total size of the images it holds rather than by their number.
+
+    Attributes:
+        max_size: The maximum total size of the cached images, in bytes.
+        size: The current total size of the cached images, in bytes.
+        hits: The number of lookups which found an image.
+        misses: The number of lookups which did not find an image.
+    """
+
+    def __init__(self, max_size: int = QR_CACHE_MAX_BYTES):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.images: OrderedDict[tuple[str, QRCodeOptions], bytes] = OrderedDict()
+        # Options each code is cached with, to invalidate every image of a code at once
+        self.codes: dict[str, set[QRCodeOptions]] = {}
+        self.lock = threading.Lock()
+
+    def get(self, code_to_print: str, options: QRCodeOptions) -> bytes | None:
+        """
+        Look up a rendered QR code.
+
+        Args:
+            code_to_print: The code encoded in the QR code.
+            options: The options the QR code was rendered with.
+        Returns:
+            The encoded image, or None if it is not cached.
+        """
+        key = (code_to_print, options)
+        with self.lock:
+            image = self.images.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self.images.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def contains(self, code_to_print: str, options: QRCodeOptions) -> bool:
+        """
+        Check whether a QR code is cached, without counting a hit or a miss.
+
+        Args:
+            code_to_print: The code encoded in the QR code.
+            options: The options the QR code was rendered with.
+        Returns:
+            True if the image is cached.
+        """
+        with self.lock:
+            return (code_to_print, options) in self.images
+
+    def put(self, code_to_print: str, options: QRCodeOptions, image: bytes) -> None:
+        """
+        Cache a rendered QR code, evicting the least recently used images if needed.
+
+        Args:
+            code_to_print: The code encoded in the QR code.
+            options: The options the QR code was rendered with.
+            image: The encoded image.
+        """
+        if len(image) > self.max_size:
+            return
+        key = (code_to_print, options)
+        with self.lock:
+            previous = self.images.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.images[key] = image
+            self.codes.setdefault(code_to_print, set()).add(options)
+            self.size += len(image)
+            while self.size > self.max_size:
+                (evicted_code, evicted_options), evicted = self.images.popitem(
+                    last=False
+                )
+                self.size -= len(evicted)
+                self.discard_code_options(evicted_code, evicted_options)
+
+    def invalidate(self, code_to_print: str) -> None:
+        """
+        Remove every cached image of a code.
+
+        Args:
+            code_to_print: The code whose images are to be removed.
+        """
+        with self.lock:
+            for options in self.codes.pop(code_to_print, set()):
+                image = self.images.pop((code_to_print, options), None)
+                if image is not None:
+                    self.size -= len(image)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.images.clear()
+            self.codes.clear()
+            self.size = 0
+
+    def stats(self) -> QRCodeCacheStats:
+        with self.lock:
+            return QRCodeCacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                entries=len(self.images),
+                size=self.size,
+                max_size=self.max_size,
+            )
+
+    def discard_code_options(self, code_to_print: str, options: QRCodeOptions) -> None:
+        options_set = self.codes.get(code_to_print)
+        if options_set is None:
+            return
+        options_set.discard(options)
+        if not options_set:
+            del self.codes[code_to_print]
+
+
+qr_code_cache = QRCodeCache()
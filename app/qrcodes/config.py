@@ -0,0 +1,23 @@
+import os
+
+# Either "numpy" (fast, 1-bit PNG written directly) or "pil" (qrcode's default backend).
+QR_RENDER_BACKEND = os.getenv("QR_RENDER_BACKEND", "numpy")
+
+# In-memory cache of rendered QR codes (see app.qrcodes.cache).
+QR_CACHE_MAX_BYTES = int(os.getenv("QR_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Process pool rendering QR codes off the event loop (see app.qrcodes.pool).
+QR_RENDER_WORKERS = int(os.getenv("QR_RENDER_WORKERS", min(os.cpu_count() or 1, 4)))
+QR_RENDER_QUEUE_SIZE = int(os.getenv("QR_RENDER_QUEUE_SIZE", 64))
+QR_RENDER_TIMEOUT = float(os.getenv("QR_RENDER_TIMEOUT", 10))
+
+# Background pre-rendering of every employee's QR code (see app.qrcodes.warmup).
+QR_WARMUP_ENABLED = os.getenv("QR_WARMUP_ENABLED", "true").lower() == "true"
+QR_WARMUP_FORMATS = os.getenv("QR_WARMUP_FORMATS", "png").split(",")
+QR_WARMUP_BATCH_SIZE = int(os.getenv("QR_WARMUP_BATCH_SIZE", 100))
+# Batches rendered at once, keep it below QR_RENDER_WORKERS to leave room for live renders
+QR_WARMUP_CONCURRENCY = int(
+    os.getenv("QR_WARMUP_CONCURRENCY", max(QR_RENDER_WORKERS // 2, 1))
+)
+# Seconds to wait before the next batch while live renders are pending
+QR_WARMUP_BACKOFF = float(os.getenv("QR_WARMUP_BACKOFF", 0.1))
@@ -0,0 +1,5 @@
+from app.qrcodes.warmup import QRCodeWarmup, qr_code_warmup
+
+
+def get_qr_code_warmup() -> QRCodeWarmup:
+    return qr_code_warmup
@@ -0,0 +1,169 @@
+import struct
+import zlib
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from app.qrcodes.models import QRCodeOptions
+from app.qrcodes.schemas import QRCodeFormat
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Palette of the 1-bit PNG images: index 0 is the background, index 1 a dark module
+PNG_PALETTE = bytes((255, 255, 255, 0, 0, 0))
+
+
+def rasterize(matrix: np.ndarray, box_size: int) -> np.ndarray:
+    """
+    Scale a module matrix to pixels.
+
+    Args:
+        matrix: A square boolean array, True for dark modules.
+        box_size: The number of pixels per module.
+    Returns:
+        A 2D boolean array, True for black pixels.
+    """
+    rows = np.repeat(matrix, box_size, axis=1)
+    return np.repeat(rows, box_size, axis=0)
+
+
+def encode_png(pixels: np.ndarray) -> bytes:
+    """
+    Encode a black and white image as a palette-mode 1-bit PNG.
+
+    Args:
+        pixels: A 2D boolean array, True for black pixels.
+    Returns:
+        The encoded PNG image.
+    """
+    height, width = pixels.shape
+    rows = np.packbits(pixels, axis=1)
+    # Each scanline starts with its filter type, 0 (none)
+    scanlines = np.hstack((np.zeros((height, 1), dtype=np.uint8), rows))
+    header = struct.pack(">IIBBBBB", width, height, 1, 3, 0, 0, 0)
+    return b"".join(
+        (
+            PNG_SIGNATURE,
+            png_chunk(b"IHDR", header),
+            png_chunk(b"PLTE", PNG_PALETTE),
+            png_chunk(b"IDAT", zlib.compress(scanlines.tobytes(), 9)),
+            png_chunk(b"IEND", b""),
+        )
+    )
+
+
+def png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + chunk_type
+        + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data))
+    )
+
+
+class QRCodeEncoder(ABC):
+    """
+    Base class for QR code output formats.
+
+    Encoders turn the module matrix of a QR code into the bytes served to clients.
+
+    Attributes:
+        media_type: The media type of the encoded QR codes.
+        extension: The file extension of the encoded QR codes.
+    """
+
+    media_type: str
+    extension: str
+
+    @abstractmethod
+    def encode(self, matrix: np.ndarray, options: QRCodeOptions) -> bytes:
+        """
+        Encode a QR code.
+
+        Args:
+            matrix: A square boolean array of the QR code's modules, True for dark modules.
+            options: The rendering options.
+        Returns:
+            The encoded QR code.
+        """
+
+
+class PNGEncoder(QRCodeEncoder):
+    """
+    Palette-mode 1-bit PNG image, box_size pixels per module.
+    """
+
+    media_type = "image/png"
+    extension = "png"
+
+    def encode(self, matrix: np.ndarray, options: QRCodeOptions) -> bytes:
+        return encode_png(rasterize(matrix, options.box_size))
+
+
+class SVGEncoder(QRCodeEncoder):
+    """
+    SVG image drawing the dark modules as a single path, box_size pixels per module.
+    """
+
+    media_type = "image/svg+xml"
+    extension = "svg"
+
+    def encode(self, matrix: np.ndarray, options: QRCodeOptions) -> bytes:
+        size = matrix.shape[0]
+        path = []
+        for y, row in enumerate(matrix):
+            # Draw each horizontal run of dark modules as one rectangle
+            edges = np.flatnonzero(
+                np.diff(np.concatenate(([0], row.view(np.int8), [0])))
+            )
+            for start, end in zip(edges[::2], edges[1::2]):
+                path.append(f"M{start} {y}h{end - start}v1h-{end - start}z")
+        pixels = size * options.box_size
+        return (
+            '<svg xmlns="http://www.w3.org/2000/svg" '
+            f'width="{pixels}" height="{pixels}" viewBox="0 0 {size} {size}" '
+            'shape-rendering="crispEdges">'
+            f'<rect width="{size}" height="{size}" fill="#fff"/>'
+            f'<path d="{"".join(path)}" fill="#000"/>'
+            "</svg>"
+        ).encode()
+
+
+class MatrixEncoder(QRCodeEncoder):
+    """
+    Bit-packed module matrix, for clients drawing the QR code themselves.
+
+    The first two bytes hold the size of the matrix (big-endian), followed by the modules
+    row by row, eight per byte, most significant bit first, 1 for dark modules. The last
+    byte is padded with zeros.
+    """
+
+    media_type = "application/octet-stream"
+    extension = "bin"
+
+    def encode(self, matrix: np.ndarray, options: QRCodeOptions) -> bytes:
+        return struct.pack(">H", matrix.shape[0]) + np.packbits(matrix).tobytes()
+
+
+class ESCPOSEncoder(QRCodeEncoder):
+    """
+    ESC/POS "GS v 0" raster bit image command, box_size dots per module, ready to be sent
+    to a receipt printer.
+    """
+
+    media_type = "application/octet-stream"
+    extension = "escpos"
+
+    def encode(self, matrix: np.ndarray, options: QRCodeOptions) -> bytes:
+        rows = np.packbits(rasterize(matrix, options.box_size), axis=1)
+        height, width = rows.shape
+        # GS v 0 m xL xH yL yH, with m = 0 (normal size) and the width in bytes
+        header = b"\x1dv0\x00" + struct.pack("<HH", width, height)
+        return header + rows.tobytes()
+
+
+QR_CODE_ENCODERS: dict[QRCodeFormat, QRCodeEncoder] = {
+    QRCodeFormat.PNG: PNGEncoder(),
+    QRCodeFormat.SVG: SVGEncoder(),
+    QRCodeFormat.MATRIX: MatrixEncoder(),
+    QRCodeFormat.ESCPOS: ESCPOSEncoder(),
+}
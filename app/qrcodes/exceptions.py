@@ -0,0 +1,11 @@
+from fastapi import HTTPException, status
+
+render_queue_full = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many QR codes are being rendered, try again later.",
+)
+
+render_timeout = HTTPException(
+    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+    detail="QR code rendering timed out.",
+)
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+from app.qrcodes.schemas import QRCodeFormat
+
+
+class QRCodeOptions(BaseModel):
+    """
+    Options used to render a QR code. Instances are hashable so they can key the cache.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    format: QRCodeFormat = QRCodeFormat.PNG
+    box_size: int = 10
+    border: int = 4
+
+
+class QRCodeCacheStats(BaseModel):
+    hits: int
+    misses: int
+    entries: int
+    size: int
+    max_size: int
+
+
+class QRCodeWarmupStatus(BaseModel):
+    running: bool
+    total: int
+    rendered: int
+    skipped: int
+    failed: int
+    started_at: datetime | None
+    finished_at: datetime | None
@@ -0,0 +1,122 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.qrcodes.config import (
+    QR_RENDER_QUEUE_SIZE,
+    QR_RENDER_TIMEOUT,
+    QR_RENDER_WORKERS,
+)
+from app.qrcodes.exceptions import render_queue_full, render_timeout
+from app.qrcodes.models import QRCodeOptions
+from app.qrcodes.services import render_qr_code, render_qr_codes
+
+
+class QRCodeRenderPool:
+    """
+    Pool of processes rendering QR codes.
+
+    Rendering and PNG encoding are CPU-bound pure Python, so they are done in separate
+    processes: requests awaiting a QR code neither hold the GIL nor block the event loop.
+    At most queue_size renders can be pending at once, further requests are rejected.
+
+    Attributes:
+        workers: The number of rendering processes.
+        queue_size: The maximum number of pending renders.
+        timeout: The number of seconds to wait for a render.
+        pending: The current number of pending renders.
+    """
+
+    def __init__(
+        self,
+        workers: int = QR_RENDER_WORKERS,
+        queue_size: int = QR_RENDER_QUEUE_SIZE,
+        timeout: float = QR_RENDER_TIMEOUT,
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.pending = 0
+        self.executor: ProcessPoolExecutor | None = None
+
+    def start(self) -> None:
+        """
+        Start the rendering processes.
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            # Processes are otherwise only spawned by the first renders
+            for _ in range(self.workers):
+                self.executor.submit(int)
+
+    def shutdown(self) -> None:
+        """
+        Stop the rendering processes, cancelling the renders which have not started yet.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def render(self, code_to_print: str, options: QRCodeOptions) -> bytes:
+        """
+        Render a QR code in one of the pool's processes.
+
+        Args:
+            code_to_print: The code to be encoded in the QR code.
+            options: The rendering options.
+        Returns:
+            The encoded image.
+        Raises:
+            HTTPException: The queue is full (503) or rendering timed out (504).
+        """
+        if self.pending >= self.queue_size:
+            raise render_queue_full
+        self.start()
+        assert self.executor is not None
+        loop = asyncio.get_running_loop()
+        try:
+            future = self.executor.submit(render_qr_code, code_to_print, options)
+            self.pending += 1
+            # A render which timed out keeps its process busy until it completes, it
+            # stays pending until then. Done callbacks run in the executor's thread.
+            future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.release))
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise render_timeout
+        except BrokenProcessPool:
+            # A rendering process died, start a new pool on the next render
+            self.shutdown()
+            raise
+
+    def release(self) -> None:
+        self.pending -= 1
+
+    async def render_batch(
+        self, codes_to_print: list[str], options: QRCodeOptions
+    ) -> list[bytes]:
+        """
+        Render a batch of QR codes in one of the pool's processes.
+
+        Batches are meant for background jobs: they are neither counted against the queue
+        size nor subject to the timeout.
+        Args:
+            codes_to_print: The codes to be encoded in the QR codes.
+            options: The rendering options.
+        Returns:
+            The encoded images, in the order of their codes.
+        """
+        self.start()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, render_qr_codes, codes_to_print, options
+            )
+        except BrokenProcessPool:
+            self.shutdown()
+            raise
+
+
+qr_code_render_pool = QRCodeRenderPool()
@@ -0,0 +1,39 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Security
+
+from app.auth.dependencies import validate_token
+from app.auth.models import TokenData
+from app.qrcodes.cache import qr_code_cache
+from app.qrcodes.dependencies import get_qr_code_warmup
+from app.qrcodes.models import QRCodeCacheStats, QRCodeWarmupStatus
+from app.qrcodes.warmup import QRCodeWarmup
+
+router = APIRouter(
+    prefix="/qrcodes",
+    tags=["qrcodes"],
+)
+
+
+@router.get("/cache", response_model=QRCodeCacheStats)
+async def get_qr_code_cache_stats(
+    token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
+):
+    return qr_code_cache.stats()
+
+
+@router.get("/warmup", response_model=QRCodeWarmupStatus)
+async def get_qr_code_warmup_status(
+    token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
+    warmup: Annotated[QRCodeWarmup, Depends(get_qr_code_warmup)],
+):
+    return warmup.status
+
+
+@router.post("/warmup", response_model=QRCodeWarmupStatus)
+async def trigger_qr_code_warmup(
+    token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
+    warmup: Annotated[QRCodeWarmup, Depends(get_qr_code_warmup)],
+):
+    warmup.trigger()
+    return warmup.status
@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class QRCodeFormat(Enum):
+    PNG = "png"
+    SVG = "svg"
+    MATRIX = "matrix"
+    ESCPOS = "escpos"
@@ -0,0 +1,73 @@
+import io
+
+import numpy as np
+import qrcode
+
+from app.qrcodes.config import QR_RENDER_BACKEND
+from app.qrcodes.encoders import QR_CODE_ENCODERS
+from app.qrcodes.models import QRCodeOptions
+from app.qrcodes.schemas import QRCodeFormat
+
+
+def get_qr_code_matrix(code_to_print: str, options: QRCodeOptions) -> np.ndarray:
+    """
+    Compute the modules of a QR code, including its border.
+
+    Args:
+        code_to_print: The code to be encoded in the QR code.
+        options: The rendering options.
+    Returns:
+        A square boolean array, True for dark modules.
+    """
+    qr = qrcode.QRCode(box_size=options.box_size, border=options.border)
+    qr.add_data(code_to_print)
+    qr.make(fit=True)
+    return np.array(qr.get_matrix(), dtype=bool)
+
+
+def render_qr_code_pil(code_to_print: str, options: QRCodeOptions) -> bytes:
+    """
+    Render a QR code with qrcode's PIL backend.
+
+    Args:
+        code_to_print: The code to be encoded in the QR code.
+        options: The rendering options.
+    Returns:
+        The encoded PNG image.
+    """
+    img = qrcode.make(code_to_print, box_size=options.box_size, border=options.border)
+    buffer = io.BytesIO()
+    img.save(buffer)
+    return buffer.getvalue()
+
+
+def render_qr_code(code_to_print: str, options: QRCodeOptions) -> bytes:
+    """
+    Render a QR code in the format given by its options.
+
+    PNG images are rendered by the backend set by QR_RENDER_BACKEND. Every other format,
+    and PNG images with the "numpy" backend, are encoded from the module matrix without
+    going through PIL.
+    Args:
+        code_to_print: The code to be encoded in the QR code.
+        options: The rendering options.
+    Returns:
+        The encoded QR code.
+    """
+    if options.format == QRCodeFormat.PNG and QR_RENDER_BACKEND == "pil":
+        return render_qr_code_pil(code_to_print, options)
+    matrix = get_qr_code_matrix(code_to_print, options)
+    return QR_CODE_ENCODERS[options.format].encode(matrix, options)
+
+
+def render_qr_codes(codes_to_print: list[str], options: QRCodeOptions) -> list[bytes]:
+    """
+    Render several QR codes with the same options, in a single call to amortise its cost.
+
+    Args:
+        codes_to_print: The codes to be encoded in the QR codes.
+        options: The rendering options.
+    Returns:
+        The encoded QR codes, in the order of their codes.
+    """
+    return [render_qr_code(code_to_print, options) for code_to_print in codes_to_print]
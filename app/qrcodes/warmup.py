@@ -0,0 +1,180 @@
+import asyncio
+import logging
+
+from sqlmodel import Session, func, select
+
+from app.database import engine
+from app.employees.models import Employee
+from app.helpers import utcnow
+from app.qrcodes.cache import QRCodeCache, qr_code_cache
+from app.qrcodes.config import (
+    QR_WARMUP_BACKOFF,
+    QR_WARMUP_BATCH_SIZE,
+    QR_WARMUP_CONCURRENCY,
+    QR_WARMUP_ENABLED,
+    QR_WARMUP_FORMATS,
+)
+from app.qrcodes.models import QRCodeOptions, QRCodeWarmupStatus
+from app.qrcodes.pool import QRCodeRenderPool, qr_code_render_pool
+from app.qrcodes.schemas import QRCodeFormat
+
+logger = logging.getLogger(__name__)
+
+
+class QRCodeWarmup:
+    """
+    Background job pre-rendering the QR code of every employee into the QR code cache.
+
+    A run pages through the employees and renders the codes which are not cached yet in
+    batches, so that the first print at the kiosk only serves cached bytes. The job is
+    throttled to leave the render pool to live traffic: at most concurrency batches are
+    rendered at once, and no batch is started while live renders are pending. Triggering
+    the job while it runs schedules another run once the current one is over.
+
+    Attributes:
+        cache: The cache the QR codes are rendered into.
+        render_pool: The pool rendering the QR codes.
+        enabled: Whether runs are started at all.
+        options: The options each QR code is rendered with, one per format.
+        batch_size: The number of QR codes rendered by each batch.
+        concurrency: The maximum number of batches rendered at once.
+    """
+
+    def __init__(
+        self,
+        cache: QRCodeCache,
+        render_pool: QRCodeRenderPool,
+        enabled: bool = QR_WARMUP_ENABLED,
+        formats: list[str] = QR_WARMUP_FORMATS,
+        batch_size: int = QR_WARMUP_BATCH_SIZE,
+        concurrency: int = QR_WARMUP_CONCURRENCY,
+    ):
+        self.cache = cache
+        self.render_pool = render_pool
+        self.enabled = enabled
+        self.options = [QRCodeOptions(format=QRCodeFormat(f.strip())) for f in formats]
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.status = QRCodeWarmupStatus(
+            running=False,
+            total=0,
+            rendered=0,
+            skipped=0,
+            failed=0,
+            started_at=None,
+            finished_at=None,
+        )
+        self.task: asyncio.Task | None = None
+        self.rerun = False
+
+    def trigger(self) -> None:
+        """
+        Start a run, or schedule another one if a run is in progress.
+        """
+        if not self.enabled:
+            return
+        if self.task is not None and not self.task.done():
+            self.rerun = True
+            return
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """
+        Cancel the current run, if any.
+        """
+        self.rerun = False
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def run(self) -> None:
+        while True:
+            self.rerun = False
+            try:
+                await self.warm_up()
+            except Exception:
+                logger.exception("QR code warm-up failed")
+            finally:
+                self.status.running = False
+                self.status.finished_at = utcnow()
+            if not self.rerun:
+                return
+
+    async def warm_up(self) -> None:
+        """
+        Render the QR codes of every employee which are not cached yet.
+        """
+        total = await asyncio.to_thread(self.count_employees)
+        self.status = QRCodeWarmupStatus(
+            running=True,
+            total=total * len(self.options),
+            rendered=0,
+            skipped=0,
+            failed=0,
+            started_at=utcnow(),
+            finished_at=None,
+        )
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks: set[asyncio.Task] = set()
+        last_internal_id = ""
+        while True:
+            employees = await asyncio.to_thread(self.get_codes_page, last_internal_id)
+            if not employees:
+                break
+            last_internal_id = employees[-1][0]
+            codes = [code_to_print for _, code_to_print in employees]
+            for options in self.options:
+                missing = [
+                    code for code in codes if not self.cache.contains(code, options)
+                ]
+                self.status.skipped += len(codes) - len(missing)
+                if not missing:
+                    continue
+                await semaphore.acquire()
+                # Live renders go first, wait until the pool is idle
+                while self.render_pool.pending:
+                    await asyncio.sleep(QR_WARMUP_BACKOFF)
+                task = asyncio.create_task(self.render_batch(missing, options))
+                task.add_done_callback(lambda _: semaphore.release())
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+
+    async def render_batch(
+        self, codes_to_print: list[str], options: QRCodeOptions
+    ) -> None:
+        try:
+            images = await self.render_pool.render_batch(codes_to_print, options)
+        except Exception:
+            logger.exception("Failed to pre-render a batch of QR codes")
+            self.status.failed += len(codes_to_print)
+            return
+        for code_to_print, image in zip(codes_to_print, images):
+            self.cache.put(code_to_print, options, image)
+        self.status.rendered += len(images)
+
+    def count_employees(self) -> int:
+        with Session(engine) as session:
+            return session.exec(select(func.count()).select_from(Employee)).one()
+
+    def get_codes_page(self, last_internal_id: str) -> list[tuple[str, str]]:
+        """
+        Fetch the next page of employee codes, by ascending internal ID.
+
+        Args:
+            last_internal_id: The internal ID of the last employee of the previous page.
+        Returns:
+            The internal IDs and codes to print of the employees of the page.
+        """
+        with Session(engine) as session:
+            rows = session.exec(
+                select(Employee.internal_id, Employee.code_to_print)
+                .where(Employee.internal_id > last_internal_id)
+                .order_by(Employee.internal_id)  # type: ignore
+                .limit(self.batch_size)
+            ).all()
+            return [tuple(row) for row in rows]  # type: ignore
+
+
+qr_code_warmup = QRCodeWarmup(qr_code_cache, qr_code_render_pool)
@@ -0,0 +1,37 @@
+import logging
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.counts import row_counts
+from app.database import async_engine
+from app.employees.models import Employee, EmployeeState
+from app.employees.utils import create_seed_employees
+from app.users.models import User
+from app.users.utils import create_seed_users
+
+logger = logging.getLogger(__name__)
+
+
+async def seed_database() -> bool:
+    """
+    Create the superuser and the fake data which do not exist yet, in a single transaction.
+
+    Seeding is idempotent and can run concurrently in several workers: the worker which
+    loses the race on the unique constraints rolls back and leaves the data of the other.
+    Returns:
+        True if anything was created.
+    """
+    async with AsyncSession(async_engine) as session:
+        users = await create_seed_users(session)
+        await create_seed_employees(session)
+        if not session.new:
+            return False
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            return False
+    row_counts.invalidate(User, Employee, EmployeeState)
+    logger.info("Seeded %d users", len(users))
+    return True
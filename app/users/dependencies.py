@@ -1,6 +1,6 @@
 from typing import Annotated
 from fastapi import Depends, Security
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.auth.dependencies import validate_token
 from app.auth.models import TokenData
 from app.database import get_session
@@ -11,7 +11,7 @@ from app.users.schemas import UserAttribute
 
 async def get_own_user(
     token_data: Annotated[TokenData, Security(validate_token, scopes=["user:own"])],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ) -> User:
     """Get own user.
     Args:
@@ -21,7 +21,7 @@ async def get_own_user(
     """
     service = UserService(session)
     assert token_data.username is not None
-    user: User = service.get_user_by_attribute(
+    user: User = await service.get_user_by_attribute(
         UserAttribute.USERNAME, token_data.username
     )
 
@@ -1,7 +1,7 @@
 from uuid import UUID
 from pydantic import validate_call
 from sqlmodel import Field, SQLModel
-from app.auth.config import OAUTH_SCOPES
+from app.auth.scopes import get_unknown_scopes
 
 
 class UserBase(SQLModel):
@@ -12,6 +12,8 @@ class User(UserBase, table=True):
     id: UUID | None = Field(default=None, primary_key=True)
     hashed_password: str
     roles: str = Field(default="")
+    # Bumped whenever roles change, revoking the roles embedded in stateless tokens
+    roles_version: int = Field(default=0)
 
 
 class UserCreate(UserBase):
@@ -53,10 +55,9 @@ class UserRolesUpdate(SQLModel, table=False):
         self.validate_roles()
 
     def validate_roles(self):
-        valid_roles = set(OAUTH_SCOPES.keys())
-        given_roles = set(self.roles.split())
-        if not given_roles.issubset(valid_roles):
-            raise ValueError(f"Invalid roles: {given_roles - valid_roles}")
+        invalid_roles = get_unknown_scopes(self.roles.split())
+        if invalid_roles:
+            raise ValueError(f"Invalid roles: {invalid_roles}")
 
 
 class UserPasswordUpdate(SQLModel, table=False):
@@ -1,8 +1,17 @@
 from typing import Annotated
 from uuid import UUID
-from fastapi import Depends, APIRouter, HTTPException, Security, status
-from sqlmodel import Session
+from fastapi import (
+    Depends,
+    APIRouter,
+    HTTPException,
+    Query,
+    Response,
+    Security,
+    status,
+)
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.database import get_session
+from app.pagination import NEXT_CURSOR_HEADER
 from app.auth.dependencies import validate_token
 from app.auth.models import TokenData
 from app.users.dependencies import get_own_user
@@ -27,11 +36,11 @@ router = APIRouter(
 async def create_user(
     user: UserCreate,
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
     service = UserService(session)
     try:
-        new_user = service.create_user(user)
+        new_user = await service.create_user(user)
         return new_user
     except HTTPException as e:
         raise e
@@ -46,11 +55,11 @@ async def create_user(
 async def get_user_by_id(
     id: UUID,
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     service = UserService(session)
     try:
-        user = service.get_user_by_attribute(UserAttribute.ID, str(id))
+        user = await service.get_user_by_attribute(UserAttribute.ID, str(id))
         return user
     except HTTPException as e:
         raise e
@@ -61,17 +70,23 @@ async def get_user_by_id(
         )
 
 
-@router.get("/all", response_model=tuple[list[UserRead], int])
+@router.get("/all", response_model=tuple[list[UserRead], int | None])
 async def get_all_users(
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
-    session: Annotated[Session, Depends(get_session)],
-    offset: int = 0,
-    limit: int = 100,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    response: Response,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    cursor: str | None = None,
+    include_total: bool = True,
 ):
     service = UserService(session)
     try:
-        users, total_count = service.get_users(offset, limit)
-        print(total_count)
+        users, total_count, next_cursor = await service.get_users(
+            offset, limit, cursor, include_total
+        )
+        if next_cursor is not None:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         return users, total_count
     except HTTPException as e:
         raise e
@@ -87,11 +102,13 @@ async def update_user_by_id(
     id: UUID,
     user: UserCreate,
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     service = UserService(session)
     try:
-        updated_user = service.update_user_by_attribute(UserAttribute.ID, str(id), user)
+        updated_user = await service.update_user_by_attribute(
+            UserAttribute.ID, str(id), user
+        )
         return updated_user
     except HTTPException as e:
         raise e
@@ -107,11 +124,11 @@ async def update_user_by_id(
 async def delete_user_by_id(
     id: UUID,
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     service = UserService(session)
     try:
-        user = service.delete_user_by_attribute(UserAttribute.ID, str(id))
+        user = await service.delete_user_by_attribute(UserAttribute.ID, str(id))
         return user
     except HTTPException as e:
         raise e
@@ -128,11 +145,11 @@ async def update_user_username_by_id(
     id: UUID,
     username_data: UserUsernameUpdate,
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     admin_service = UserAdminService(session)
     try:
-        updated_user = admin_service.update_user_username_by_attribute(
+        updated_user = await admin_service.update_user_username_by_attribute(
             UserAttribute.ID, str(id), username_data
         )
         return updated_user
@@ -150,11 +167,11 @@ async def update_user_roles_by_id(
     id: UUID,
     roles_data: UserRolesUpdate,
     token_data: Annotated[TokenData, Security(validate_token, scopes=["admin"])],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     admin_service = UserAdminService(session)
     try:
-        updated_user = admin_service.update_user_roles_by_attribute(
+        updated_user = await admin_service.update_user_roles_by_attribute(
             UserAttribute.ID, str(id), roles_data
         )
         return updated_user
@@ -175,11 +192,11 @@ async def get_own_user(user: Annotated[User, Depends(get_own_user)]):
 @router.delete("/me", response_model=UserRead)
 async def delete_own_user(
     user: Annotated[User, Depends(get_own_user)],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     service = UserService(session)
     try:
-        service.delete_user(user)
+        await service.delete_user(user)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -195,11 +212,11 @@ async def delete_own_user(
 async def update_own_password(
     user: Annotated[User, Depends(get_own_user)],
     password_data: UserPasswordUpdate,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     service = UserService(session)
     try:
-        service.update_user_password(user, password_data)
+        await service.update_user_password(user, password_data)
     except HTTPException as e:
         raise e
     except Exception as e:
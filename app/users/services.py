@@ -1,8 +1,13 @@
 from uuid import uuid4
-from sqlmodel import Session, select, func
-from sqlalchemy.exc import MultipleResultsFound, NoResultFound
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.exc import IntegrityError, MultipleResultsFound, NoResultFound
+from app.auth.cache import principal_cache
 from app.auth.exceptions import incorrect_password
-from app.auth.services import get_password_hash, verify_password
+from app.auth.services import check_password, hash_password
+from app.auth.versions import roles_versions
+from app.counts import row_counts
+from app.pagination import get_page, get_page_statement
 from app.users.exceptions import (
     user_not_found,
     multiple_users_found,
@@ -23,38 +28,40 @@ class UserServiceBase:
     Base class for user-related operations.
 
     Attributes:
-        session: The database session to be used for operations.
+        session: The asynchronous database session to be used for operations.
     """
 
-    def __init__(self, session: Session):
+    def __init__(self, session: AsyncSession):
         self.session = session
 
-    def create_user(self, user: UserCreate) -> User:
+    async def create_user(self, user: UserCreate) -> User:
         """
         Create a new user.
+
+        The user is inserted straight away, the unique username rejects a user created
+        meanwhile by a concurrent request.
         Args:
             user: The user data.
         Returns:
             The created user.
         """
-        try:
-            self.session.exec(select(User).where(User.username == user.username)).one()
-            raise user_already_exists
-        except NoResultFound:
-            pass
-
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await hash_password(user.password)
         new_user = User(
             id=uuid4(), username=user.username, hashed_password=hashed_password
         )
         db_user = User.model_validate(new_user)
         self.session.add(db_user)
-        self.session.commit()
-        self.session.refresh(db_user)
+        try:
+            await self.session.commit()
+        except IntegrityError:
+            await self.session.rollback()
+            raise user_already_exists
+        row_counts.invalidate(User)
+        roles_versions.set(db_user.username, db_user.id, db_user.roles_version)
 
         return db_user
 
-    def get_user_by_attribute(self, attribute: UserAttribute, value: str) -> User:
+    async def get_user_by_attribute(self, attribute: UserAttribute, value: str) -> User:
         """
         Get a user by a specified attribute.
         Args:
@@ -64,8 +71,10 @@ class UserServiceBase:
             The user with the specified attribute and value.
         """
         try:
-            user = self.session.exec(
-                select(User).where(getattr(User, attribute.value) == value)
+            user = (
+                await self.session.exec(
+                    select(User).where(getattr(User, attribute.value) == value)
+                )
             ).one()
         except MultipleResultsFound:
             raise multiple_users_found
@@ -73,7 +82,7 @@ class UserServiceBase:
             raise user_not_found
         return user
 
-    def update_user_by_attribute(
+    async def update_user_by_attribute(
         self, attribute: UserAttribute, value: str, user: UserCreate
     ) -> User:
         """
@@ -86,20 +95,25 @@ class UserServiceBase:
             The updated user.
         """
         try:
-            user_db = self.get_user_by_attribute(attribute, value)
+            user_db = await self.get_user_by_attribute(attribute, value)
+            old_username = user_db.username
             user_data = user.model_dump()
             for key, value in user_data.items():
                 setattr(user_db, key, value)
+            user_db.roles_version += 1
             self.session.add(user_db)
-            self.session.commit()
-            self.session.refresh(user_db)
+            await self.session.commit()
+            principal_cache.invalidate(old_username, user_db.username)
+            roles_versions.remove(old_username)
+            roles_versions.set(user_db.username, user_db.id, user_db.roles_version)
+            await self.session.refresh(user_db)
             return user_db
         except NoResultFound:
             raise user_not_found
         except MultipleResultsFound:
             raise multiple_users_found
 
-    def delete_user(self, user: User) -> User:
+    async def delete_user(self, user: User) -> User:
         """
         Delete a user.
         Args:
@@ -108,13 +122,19 @@ class UserServiceBase:
             The deleted user.
         """
         try:
-            self.session.delete(user)
-            self.session.commit()
+            username = user.username
+            await self.session.delete(user)
+            await self.session.commit()
+            row_counts.invalidate(User)
+            principal_cache.invalidate(username)
+            roles_versions.remove(username)
         except NoResultFound:
             raise user_not_found
         return user
 
-    def delete_user_by_attribute(self, attribute: UserAttribute, value: str) -> User:
+    async def delete_user_by_attribute(
+        self, attribute: UserAttribute, value: str
+    ) -> User:
         """
         Delete a user using a specified attribute.
         Args:
@@ -124,41 +144,61 @@ class UserServiceBase:
             The deleted user.
         """
         try:
-            user = self.get_user_by_attribute(attribute, value)
-            self.session.delete(user)
-            self.session.commit()
+            user = await self.get_user_by_attribute(attribute, value)
+            username = user.username
+            await self.session.delete(user)
+            await self.session.commit()
+            row_counts.invalidate(User)
+            principal_cache.invalidate(username)
+            roles_versions.remove(username)
             return user
         except NoResultFound:
             raise user_not_found
         except MultipleResultsFound:
             raise multiple_users_found
 
-    def get_users(self, offset: int = 0, limit: int = 100):
+    async def get_users(
+        self,
+        offset: int = 0,
+        limit: int = 100,
+        cursor: str | None = None,
+        include_total: bool = True,
+    ) -> tuple[list[User], int | None, str | None]:
         """
-        Get all users.
+        Get a page of users, ordered by username.
         Args:
-            offset: The number of users to skip.
+            offset: The number of users to skip, ignored with a cursor.
             limit: The maximum number of users to return.
+            cursor: The cursor of the page, as returned with the previous page.
+            include_total: Whether to count the users, the count is cached for a few
+                seconds.
         Returns:
-            The list of users.
+            The list of users, the total number of users if included, and the cursor of
+            the next page if there is one.
         """
-        total_count_statement = select(func.count()).select_from(User)
-        total_count: int = self.session.exec(total_count_statement).one()
-        users = self.session.exec(select(User).offset(offset).limit(limit)).all()
-        return users, total_count
+        total_count = (
+            await row_counts.get(self.session, User) if include_total else None
+        )
+        statement = get_page_statement(
+            select(User), User.username, offset, limit, cursor
+        )
+        users, next_cursor = get_page(
+            (await self.session.exec(statement)).all(), "username", limit
+        )
+        return users, total_count, next_cursor
 
 
 class UserService(UserServiceBase):
     """
     Class for user-related operations.
     Attributes:
-        session: The database session to be used for operations.
+        session: The asynchronous database session to be used for operations.
     """
 
-    def __init__(self, session: Session):
+    def __init__(self, session: AsyncSession):
         super().__init__(session)
 
-    def update_user_password(
+    async def update_user_password(
         self, user: User, password_data: UserPasswordUpdate
     ) -> None:
         """
@@ -167,25 +207,25 @@ class UserService(UserServiceBase):
             user: The user.
             password_data: The new password data.
         """
-        if not verify_password(password_data.old_password, user.hashed_password):
+        if not await check_password(password_data.old_password, user.hashed_password):
             raise incorrect_password
         else:
-            user.hashed_password = get_password_hash(password_data.new_password)
+            user.hashed_password = await hash_password(password_data.new_password)
             self.session.add(user)
-            self.session.commit()
+            await self.session.commit()
 
 
 class UserAdminService(UserServiceBase):
     """
     Class for user-related operations.
     Attributes:
-        session: The database session to be used for operations.
+        session: The asynchronous database session to be used for operations.
     """
 
-    def __init__(self, session: Session):
+    def __init__(self, session: AsyncSession):
         super().__init__(session)
 
-    def update_user_username_by_attribute(
+    async def update_user_username_by_attribute(
         self, attribute: UserAttribute, value: str, new_username: UserUsernameUpdate
     ) -> User:
         """
@@ -198,18 +238,23 @@ class UserAdminService(UserServiceBase):
             The updated user.
         """
         try:
-            user = self.get_user_by_attribute(attribute, value)
+            user = await self.get_user_by_attribute(attribute, value)
+            old_username = user.username
             user.username = new_username.username
+            user.roles_version += 1
             self.session.add(user)
-            self.session.commit()
-            self.session.refresh(user)
+            await self.session.commit()
+            principal_cache.invalidate(old_username, user.username)
+            roles_versions.remove(old_username)
+            roles_versions.set(user.username, user.id, user.roles_version)
+            await self.session.refresh(user)
             return user
         except NoResultFound:
             raise user_not_found
         except MultipleResultsFound:
             raise multiple_users_found
 
-    def update_user_roles_by_attribute(
+    async def update_user_roles_by_attribute(
         self, attribute: UserAttribute, value: str, new_roles: UserRolesUpdate
     ) -> User:
         """
@@ -222,11 +267,16 @@ class UserAdminService(UserServiceBase):
             The updated user.
         """
         try:
-            user = self.get_user_by_attribute(attribute, value)
+            user = await self.get_user_by_attribute(attribute, value)
+            if user.roles == new_roles.roles:
+                return user
             user.roles = new_roles.roles
+            user.roles_version += 1
             self.session.add(user)
-            self.session.commit()
-            self.session.refresh(user)
+            await self.session.commit()
+            principal_cache.invalidate(user.username)
+            roles_versions.set(user.username, user.id, user.roles_version)
+            await self.session.refresh(user)
             return user
         except NoResultFound:
             raise user_not_found
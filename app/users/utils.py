@@ -1,45 +1,69 @@
-from fastapi import HTTPException
-from sqlmodel import Session
-from app.database import engine
-from app.users.services import UserService, UserAdminService
-from app.users.models import UserCreate, UserRolesUpdate
-from app.users.schemas import UserAttribute
-
-
-def create_superuser():
-    session: Session = Session(engine)
-    service = UserService(session)
-    admin_user: UserCreate = UserCreate(
-        username="admin",
-        password="secret",
-    )
-    try:
-        service.create_user(admin_user)
-    except HTTPException as e:
-        pass
-
-    admin_service = UserAdminService(session)
-    admin_service.update_user_roles_by_attribute(
-        UserAttribute.USERNAME, "admin", UserRolesUpdate(roles="admin")
+import asyncio
+from uuid import uuid4
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.auth.pool import password_hashing_pool
+from app.auth.services import hash_password
+from app.config import SEED_FAKE_USERS
+from app.users.models import User
+
+
+def get_seed_users() -> list[tuple[str, str, str]]:
+    """
+    Get the users created by seeding: the superuser and fake users.
+
+    Returns:
+        The username, password and roles of every seed user.
+    """
+    users = [("admin", "secret", "admin")]
+    for i in range(SEED_FAKE_USERS):
+        roles = "user:own websockets" if i % 2 == 0 else ""
+        users.append((f"fake_user_{i}", "secret", roles))
+    return users
+
+
+async def create_seed_users(session: AsyncSession) -> list[User]:
+    """
+    Add the seed users which do not exist yet to the session, without committing.
+
+    Existing users are left untouched. Passwords are hashed concurrently, a few at a time
+    so that logins still find room in the password hashing pool.
+    Args:
+        session: The database session to add the users to.
+    Returns:
+        The added users.
+    """
+    seed_users = get_seed_users()
+    existing_usernames = set(
+        (
+            await session.exec(
+                select(User.username).where(
+                    User.username.in_([username for username, _, _ in seed_users])  # type: ignore
+                )
+            )
+        ).all()
     )
+    missing_users = [user for user in seed_users if user[0] not in existing_usernames]
 
+    hashed_passwords: list[str] = []
+    batch_size = password_hashing_pool.workers
+    for start in range(0, len(missing_users), batch_size):
+        hashed_passwords += await asyncio.gather(
+            *(
+                hash_password(password)
+                for _, password, _ in missing_users[start : start + batch_size]
+            )
+        )
 
-def create_fake_users():
-    session: Session = Session(engine)
-    service = UserService(session)
-    for i in range(150):
-        user: UserCreate = UserCreate(
-            username=f"fake_user_{i}",
-            password="secret",
+    users = [
+        User(
+            id=uuid4(), username=username, hashed_password=hashed_password, roles=roles
         )
-        try:
-            service.create_user(user)
-        except HTTPException as e:
-            pass
-        if i % 2 == 0:
-            admin_service = UserAdminService(session)
-            admin_service.update_user_roles_by_attribute(
-                UserAttribute.USERNAME,
-                f"fake_user_{i}",
-                UserRolesUpdate(roles="user:own websockets"),
-            )
+        for (username, _, roles), hashed_password in zip(
+            missing_users, hashed_passwords
+        )
+    ]
+    session.add_all(users)
+    return users
@@ -29,7 +29,8 @@ export const usePixelStore = defineStore('pixel', () => {
                     }
                 }
             );
-            //Object.assign(employeeState, response.data);
+            // The code is queued for delivery: the returned state only reports it as sent
+            // once the email has actually been delivered.
             employeeState.email_code_sent = response.data.email_code_sent;
             if (identity.email) {
                 identifierStatus.email_exists = true;
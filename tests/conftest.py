@@ -0,0 +1,51 @@
+import os
+import tempfile
+from uuid import uuid4
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlmodel import Session
+
+# The app reads its configuration when it is imported
+os.environ["DATABASE_URL"] = os.getenv(
+    "TEST_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/database.db"
+)
+os.environ["SEED_DATABASE"] = "false"
+os.environ.setdefault("SECRET_KEY", "secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("ORIGINS", "[]")
+# Hash the passwords of every concurrent request instead of rejecting some of them
+os.environ["PASSWORD_HASHING_QUEUE_SIZE"] = "100"
+
+from app.auth.services import create_access_token  # noqa: E402
+from app.database import async_engine, create_db_and_tables, engine  # noqa: E402
+from app.main import api  # noqa: E402
+from app.users.models import User  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def admin_headers() -> dict[str, str]:
+    create_db_and_tables()
+    with Session(engine) as session:
+        session.add(
+            User(id=uuid4(), username="admin", hashed_password="", roles="admin")
+        )
+        session.commit()
+    token = create_access_token({"sub": "admin", "scopes": ["admin"]})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+async def client():
+    # Session-scoped, so that every test runs in the same event loop
+    async with AsyncClient(
+        transport=ASGITransport(app=api), base_url="http://test"
+    ) as client:
+        yield client
+    await async_engine.dispose()
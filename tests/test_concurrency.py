@@ -0,0 +1,123 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.anyio
+
+# Number of identical requests sent at once
+N = 20
+
+
+async def post_concurrently(client: AsyncClient, url: str, **kwargs) -> Counter:
+    responses = await asyncio.gather(*(client.post(url, **kwargs) for _ in range(N)))
+    return Counter(response.status_code for response in responses)
+
+
+async def test_create_employee(client: AsyncClient, admin_headers: dict[str, str]):
+    employee = {
+        "internal_id": "E1",
+        "email": "e1@example.com",
+        "code_to_print": "C1",
+        "surname": "Doe",
+        "firstname": "Jane",
+    }
+    statuses = await post_concurrently(
+        client, "/employees/", json=employee, headers=admin_headers
+    )
+    assert statuses[200] == 1
+    assert statuses[400] == N - 1
+
+
+async def test_create_user(client: AsyncClient, admin_headers: dict[str, str]):
+    statuses = await post_concurrently(
+        client,
+        "/users/",
+        json={"username": "jane", "password": "secret"},
+        headers=admin_headers,
+    )
+    assert statuses[200] == 1
+    assert statuses[409] == N - 1
+
+
+async def test_send_email(client: AsyncClient, admin_headers: dict[str, str]):
+    employee = {
+        "internal_id": "E2",
+        "email": "e2@example.com",
+        "code_to_print": "C2",
+        "surname": "Doe",
+        "firstname": "John",
+    }
+    response = await client.post("/employees/", json=employee, headers=admin_headers)
+    assert response.status_code == 200
+    # Sending the code again is allowed, every request must share the same state
+    statuses = await post_concurrently(
+        client, "/employees/send-email", json={"internal_id": "E2"}
+    )
+    assert statuses[200] == N
+    response = await client.get(
+        "/employees/state/all", params={"limit": 1000}, headers=admin_headers
+    )
+    states = [state for state in response.json() if state["internal_id"] == "E2"]
+    assert len(states) == 1
+
+
+async def test_ensure_employee_state(
+    client: AsyncClient, admin_headers: dict[str, str]
+):
+    employee = {
+        "internal_id": "E3",
+        "email": "e3@example.com",
+        "code_to_print": "C3",
+        "surname": "Doe",
+        "firstname": "Jim",
+    }
+    response = await client.post("/employees/", json=employee, headers=admin_headers)
+    assert response.status_code == 200
+    # Every request finds the code not validated, in the one state created meanwhile
+    statuses = await post_concurrently(
+        client, "/employees/qr-code", json={"internal_id": "E3"}
+    )
+    assert statuses[403] == N
+    response = await client.get(
+        "/employees/state/all", params={"limit": 1000}, headers=admin_headers
+    )
+    states = [state for state in response.json() if state["internal_id"] == "E3"]
+    assert len(states) == 1
+
+
+async def test_campaign(client: AsyncClient, admin_headers: dict[str, str]):
+    internal_ids = [f"K{i}" for i in range(N)]
+    for internal_id in internal_ids:
+        employee = {
+            "internal_id": internal_id,
+            "email": f"{internal_id.lower()}@example.com",
+            "code_to_print": f"C-{internal_id}",
+            "surname": "Doe",
+            "firstname": "Kim",
+        }
+        response = await client.post(
+            "/employees/", json=employee, headers=admin_headers
+        )
+        assert response.status_code == 200
+    # The kiosk creates some of the states while the campaign creates them all
+    campaign, *fetches = await asyncio.gather(
+        client.post(
+            "/employees/campaigns",
+            json={"target": "ids", "internal_ids": internal_ids},
+            headers=admin_headers,
+        ),
+        *(
+            client.post("/employees/qr-code", json={"internal_id": internal_id})
+            for internal_id in internal_ids
+        ),
+    )
+    assert campaign.status_code == 200
+    assert campaign.json()["total"] == N
+    assert all(response.status_code == 403 for response in fetches)
+    response = await client.get(
+        "/employees/state/all", params={"limit": 1000}, headers=admin_headers
+    )
+    states = Counter(state["internal_id"] for state in response.json())
+    assert all(states[internal_id] == 1 for internal_id in internal_ids)
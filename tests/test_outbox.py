@@ -0,0 +1,235 @@
+import asyncio
+import socket
+from collections.abc import Iterator
+from datetime import timedelta
+
+import pytest
+from aiosmtpd.controller import Controller
+from httpx import AsyncClient
+from sqlmodel import Session, delete, select, update
+
+from app.database import engine
+from app.emails.services import EmailService
+from app.employees import workers
+from app.employees.config import EMAIL_OUTBOX_MAX_ATTEMPTS
+from app.employees.models import EmailOutbox, EmailOutboxStatus
+from app.employees.services import EmailOutboxService
+from app.employees.workers import EmailOutboxWorkers
+from app.helpers import utcnow
+
+pytestmark = pytest.mark.anyio
+
+# Receiver whose emails the SMTP server rejects
+REJECTED_EMAIL = "rejected@example.com"
+
+
+class SMTPHandler:
+    """
+    aiosmtpd handler keeping the delivered emails, and rejecting REJECTED_EMAIL.
+    """
+
+    def __init__(self):
+        self.port = 0
+        self.emails: list[tuple[list[str], str]] = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == REJECTED_EMAIL:
+            return "550 Mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.emails.append((envelope.rcpt_tos, envelope.content.decode()))
+        return "250 Message accepted for delivery"
+
+
+@pytest.fixture
+def smtp_handler() -> Iterator[SMTPHandler]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    handler = SMTPHandler()
+    handler.port = port
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture
+def outbox_workers(smtp_handler: SMTPHandler) -> Iterator[EmailOutboxWorkers]:
+    # The emails queued by the other tests are not delivered
+    with Session(engine) as session:
+        session.exec(delete(EmailOutbox))  # type: ignore
+        session.commit()
+    email_service = EmailService()
+    email_service.server_address = "127.0.0.1"
+    email_service.port = smtp_handler.port
+    email_service.email_address = "pixelcode@example.com"
+    yield EmailOutboxWorkers(email_service, size=1)
+    email_service.close()
+
+
+async def create_employee(
+    client: AsyncClient,
+    admin_headers: dict[str, str],
+    internal_id: str,
+    email: str | None = None,
+) -> None:
+    employee = {
+        "internal_id": internal_id,
+        "email": email or f"{internal_id.lower()}@example.com",
+        "code_to_print": f"C-{internal_id}",
+        "surname": "Doe",
+        "firstname": "Jane",
+    }
+    response = await client.post("/employees/", json=employee, headers=admin_headers)
+    assert response.status_code == 200
+
+
+async def send_code(client: AsyncClient, internal_id: str) -> None:
+    response = await client.post(
+        "/employees/send-email", json={"internal_id": internal_id}
+    )
+    assert response.status_code == 200
+    assert response.json()["email_code_sent"] is False
+
+
+async def get_state(
+    client: AsyncClient, admin_headers: dict[str, str], internal_id: str
+) -> dict:
+    response = await client.get(
+        "/employees/state/all", params={"limit": 1000}, headers=admin_headers
+    )
+    (state,) = [s for s in response.json() if s["internal_id"] == internal_id]
+    return state
+
+
+def get_emails(internal_id: str) -> list[EmailOutbox]:
+    with Session(engine) as session:
+        return list(
+            session.exec(
+                select(EmailOutbox).where(EmailOutbox.internal_id == internal_id)
+            ).all()
+        )
+
+
+async def test_deliver_email(
+    client: AsyncClient,
+    admin_headers: dict[str, str],
+    smtp_handler: SMTPHandler,
+    outbox_workers: EmailOutboxWorkers,
+):
+    await create_employee(client, admin_headers, "O1")
+    await send_code(client, "O1")
+    assert await asyncio.to_thread(outbox_workers.deliver_batch) == 1
+    ((receivers, content),) = smtp_handler.emails
+    assert receivers == ["o1@example.com"]
+    assert "Your email verification code is" in content
+    (email,) = get_emails("O1")
+    assert email.status == EmailOutboxStatus.SENT
+    assert email.attempts == 1
+    assert (await get_state(client, admin_headers, "O1"))["email_code_sent"] is True
+    # Nothing is left to deliver
+    assert await asyncio.to_thread(outbox_workers.deliver_batch) == 0
+
+
+async def test_qr_code_keeps_email_code_sent(
+    client: AsyncClient,
+    admin_headers: dict[str, str],
+    outbox_workers: EmailOutboxWorkers,
+):
+    await create_employee(client, admin_headers, "O2")
+    await send_code(client, "O2")
+    await asyncio.to_thread(outbox_workers.deliver_batch)
+    assert (await get_state(client, admin_headers, "O2"))["email_code_sent"] is True
+    # The code has not been validated yet
+    response = await client.post("/employees/qr-code", json={"internal_id": "O2"})
+    assert response.status_code == 403
+    assert (await get_state(client, admin_headers, "O2"))["email_code_sent"] is True
+
+
+async def test_retry_with_backoff_then_give_up(
+    client: AsyncClient,
+    admin_headers: dict[str, str],
+    smtp_handler: SMTPHandler,
+    outbox_workers: EmailOutboxWorkers,
+):
+    await create_employee(client, admin_headers, "O3", REJECTED_EMAIL)
+    await send_code(client, "O3")
+    backoff = timedelta(0)
+    for attempt in range(1, EMAIL_OUTBOX_MAX_ATTEMPTS):
+        assert await asyncio.to_thread(outbox_workers.deliver_batch) == 1
+        (email,) = get_emails("O3")
+        assert email.status == EmailOutboxStatus.PENDING
+        assert email.attempts == attempt
+        assert "Mailbox unavailable" in (email.last_error or "")
+        # Not due yet, and later after each attempt
+        assert email.next_attempt_at - utcnow() > backoff
+        backoff = email.next_attempt_at - utcnow()
+        assert await asyncio.to_thread(outbox_workers.deliver_batch) == 0
+        with Session(engine) as session:
+            session.exec(
+                update(EmailOutbox)  # type: ignore
+                .where(EmailOutbox.id == email.id)
+                .values(next_attempt_at=utcnow())
+            )
+            session.commit()
+    assert await asyncio.to_thread(outbox_workers.deliver_batch) == 1
+    (email,) = get_emails("O3")
+    assert email.status == EmailOutboxStatus.FAILED
+    assert email.attempts == EMAIL_OUTBOX_MAX_ATTEMPTS
+    assert smtp_handler.emails == []
+    assert (await get_state(client, admin_headers, "O3"))["email_code_sent"] is False
+    # Failed emails are not retried
+    assert await asyncio.to_thread(outbox_workers.deliver_batch) == 0
+
+
+async def test_claim_emails(
+    client: AsyncClient,
+    admin_headers: dict[str, str],
+    outbox_workers: EmailOutboxWorkers,
+):
+    await create_employee(client, admin_headers, "O4")
+    await send_code(client, "O4")
+    await send_code(client, "O4")
+    with Session(engine) as session:
+        service = EmailOutboxService(session)
+        (first,) = service.claim_emails(1)
+        (second,) = service.claim_emails(1)
+        assert first.id != second.id
+        # Both are leased
+        assert service.claim_emails(1) == []
+        # An expired lease is claimed again
+        first.locked_until = utcnow() - timedelta(seconds=1)
+        session.add(first)
+        session.commit()
+        (claimed,) = service.claim_emails(1)
+        assert claimed.id == first.id
+        assert claimed.locked_until > utcnow()
+
+
+async def test_renew_lease(
+    client: AsyncClient,
+    admin_headers: dict[str, str],
+    smtp_handler: SMTPHandler,
+    outbox_workers: EmailOutboxWorkers,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    await create_employee(client, admin_headers, "O5")
+    await send_code(client, "O5")
+    await send_code(client, "O5")
+    renewed: list[int] = []
+    renew_lease = EmailOutboxService.renew_lease
+
+    def record_renew_lease(self, emails):
+        renewed.append(len(emails))
+        renew_lease(self, emails)
+
+    monkeypatch.setattr(EmailOutboxService, "renew_lease", record_renew_lease)
+    # Half of the lease has elapsed before each email
+    monkeypatch.setattr(workers, "EMAIL_OUTBOX_LEASE_SECONDS", 0)
+    assert await asyncio.to_thread(outbox_workers.deliver_batch) == 2
+    assert renewed == [2, 1]
+    assert len(smtp_handler.emails) == 2
+    assert all(email.status == EmailOutboxStatus.SENT for email in get_emails("O5"))